@@ -68,6 +68,27 @@ def main(verbose: bool) -> None:
     default="service",
     help="How to organize entries in groups",
 )
+@click.option(
+    "--read-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help=(
+        "Number of keyring passwords to read concurrently. Used with SecretService "
+        "when secretstorage is installed and with backends listing their credentials; "
+        "other backends are read one password at a time"
+    ),
+)
+@click.option(
+    "--secret-cache",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Cache file used to skip keyring items unchanged since the last export",
+)
+@click.option(
+    "--kdf-iterations",
+    type=click.IntRange(min=1),
+    help="Key derivation iterations to save the database with (lower is faster but weaker)",
+)
 @click.option(
     "--test-keyring",
     is_flag=True,
@@ -79,6 +100,9 @@ def export(
     backup: bool,
     on_conflict: str,
     group_by: str,
+    read_workers: int,
+    secret_cache: Path | None,
+    kdf_iterations: int | None,
     test_keyring: bool,
 ) -> None:
     """Export all keyring credentials to a KeePass database file."""
@@ -112,6 +136,9 @@ def export(
             conflict_resolution=conflict_res,
             group_strategy=group_strat,
             create_backup=backup,
+            read_workers=read_workers,
+            cache_path=secret_cache,
+            kdf_params={"iterations": kdf_iterations} if kdf_iterations else None,
         )
 
         # Run export
@@ -201,8 +228,8 @@ def _test_keyring() -> None:
         reader = KeyringReader()
         click.echo(f"✓ Keyring backend: {reader.backend.__class__.__name__}")
 
-        # Test if backend is working
-        if reader.test_backend():
+        # Test if backend is working, with a real round trip as asked for
+        if reader.test_backend(deep=True):
             click.echo("✓ Keyring backend is working correctly")
         else:
             click.echo("✗ Keyring backend test failed", err=True)
@@ -210,13 +237,14 @@ def _test_keyring() -> None:
 
         # Try to get credentials
         click.echo("\nAttempting to enumerate credentials...")
-        credentials = reader.get_all_credentials()
+        # Only service and username are shown, so skip building full entries
+        credentials = list(reader.iter_triples())
 
         if credentials:
             click.echo(f"✓ Found {len(credentials)} credentials")
             click.echo("\nSample entries (passwords hidden):")
-            for i, cred in enumerate(credentials[:5], 1):
-                click.echo(f"  {i}. {cred.service} / {cred.username}")
+            for i, (service, username, _password) in enumerate(credentials[:5], 1):
+                click.echo(f"  {i}. {service} / {username}")
             if len(credentials) > 5:
                 click.echo(f"  ... and {len(credentials) - 5} more")
         else:
@@ -1,19 +1,102 @@
 """Module for orchestrating the export of keyring credentials to KDBX."""
 
+import functools
+import itertools
 import logging
+import os
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from keyring_to_kdbx.kdbx_manager import KdbxManager
+from keyring_to_kdbx.kdbx_manager import KdbxManager, _sanitize_entry_field
 from keyring_to_kdbx.keyring_reader import KeyringEntry, KeyringReader
+from keyring_to_kdbx.secret_cache import SecretCache
 
 if TYPE_CHECKING:
+    from uuid import UUID
+
     from pykeepass.entry import Entry
 
 logger = logging.getLogger(__name__)
 
 
+# Host part of a service name, ignoring any scheme and "www." prefix
+# Common patterns: "https://example.com", "example.com", etc.
+_DOMAIN_RE = re.compile(r"^(?:https?://)?(?:www\.)?([^/:]+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _domain_from_service(service: str) -> str:
+    """
+    Extract the domain from a service name.
+
+    Results are memoised, as the same services come up again and again.
+
+    Args:
+        service: The service name.
+
+    Returns:
+        The lowercased domain, or the service name if it doesn't look like one.
+    """
+    match = _DOMAIN_RE.match(service)
+    if match is None:
+        return service
+
+    # If it looks like a domain, use it
+    domain = match.group(1).lower()
+    if "." in domain or domain in ("localhost", "local"):
+        return domain
+
+    # Otherwise, fall back to service name
+    return service
+
+
+def _entry_spec(
+    service: str, entry: KeyringEntry, group_name: str | None, notes: str
+) -> dict[str, Any]:
+    """
+    Build the KdbxManager.add_entries() specification for a keyring entry.
+
+    Args:
+        service: Service name to store the entry under.
+        entry: The keyring entry to add.
+        group_name: The group name for the entry.
+        notes: Notes for the entry.
+
+    Returns:
+        The entry specification.
+    """
+    return {
+        "service": service,
+        "username": entry.username,
+        "password": entry.password,
+        "group_name": group_name,
+        "notes": notes,
+        "attributes": entry.attributes,
+    }
+
+
+def _queue_key(service: str, username: str, group_name: str | None) -> tuple[str, str, str | None]:
+    """
+    Return the key an entry is queued under.
+
+    Titles are stored sanitised, so services that only differ by characters
+    the manager removes end up as the same entry and share a queue slot.
+
+    Args:
+        service: Service name the entry is stored under.
+        username: Username of the entry.
+        group_name: The group name for the entry.
+
+    Returns:
+        The queue key, matching the one the manager indexes the entry under.
+    """
+    return _sanitize_entry_field(service), username, group_name
+
+
 class ConflictResolution(Enum):
     """Strategy for handling duplicate entries."""
 
@@ -30,16 +113,15 @@ class GroupStrategy(Enum):
     DOMAIN = "domain"  # Group by domain (extracted from service)
 
 
+@dataclass(slots=True)
 class ExportResult:
     """Result of an export operation."""
 
-    def __init__(self) -> None:
-        """Initialise export result counters."""
-        self.added: int = 0
-        self.updated: int = 0
-        self.skipped: int = 0
-        self.errors: int = 0
-        self.total: int = 0
+    added: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: int = 0
+    total: int = 0
 
     def __str__(self) -> str:
         """Return a human-readable summary."""
@@ -60,6 +142,10 @@ class KeyringExporter:
         conflict_resolution: ConflictResolution = ConflictResolution.SKIP,
         group_strategy: GroupStrategy = GroupStrategy.SERVICE,
         create_backup: bool = False,
+        *,
+        read_workers: int = 1,
+        cache_path: Path | None = None,
+        kdf_params: dict[str, int] | None = None,
     ) -> None:
         """
         Initialise the exporter.
@@ -70,26 +156,60 @@ class KeyringExporter:
             conflict_resolution: How to handle duplicate entries.
             group_strategy: How to organise entries into groups.
             create_backup: Whether to backup existing KDBX file.
+            read_workers: Number of threads used to read keyring passwords, on the
+                backends KeyringReader reads concurrently.
+            cache_path: Optional secret cache file. When set, keyring items that have
+                not changed since they were last exported are skipped without being
+                decrypted.
+            kdf_params: Optional key derivation settings for the database, see
+                KdbxManager.
         """
         self.output_path = output_path
-        self.password = password
+        # Released when export() finishes, see export()
+        self.password: str | None = password
         self.conflict_resolution = conflict_resolution
         self.group_strategy = group_strategy
         self.create_backup = create_backup
-
-        self.keyring_reader = KeyringReader()
+        self.cache_path = cache_path
+        self.kdf_params = kdf_params
+
+        # Strategy implementations, looked up once instead of compared for every entry
+        self._handle_conflict = {
+            ConflictResolution.SKIP: self._skip_conflict,
+            ConflictResolution.OVERWRITE: self._overwrite_conflict,
+            ConflictResolution.RENAME: self._rename_conflict,
+        }[conflict_resolution]
+        self._get_group_name = {
+            GroupStrategy.FLAT: lambda _service: None,
+            GroupStrategy.SERVICE: lambda service: service,
+            GroupStrategy.DOMAIN: _domain_from_service,
+        }[group_strategy]
+
+        self.keyring_reader = KeyringReader(max_workers=read_workers)
         self.kdbx_manager: KdbxManager | None = None
 
+        # Writes queued during export, flushed to the database in batches
+        self._new_entries: dict[tuple[str, str, str | None], dict[str, Any]] = {}
+        # Updates are keyed by the UUID of the entry they apply to
+        self._updates: dict[UUID, tuple[Entry, dict[str, Any]]] = {}
+
     def export(self) -> ExportResult:
         """
         Export all keyring credentials to KDBX file.
 
+        The exporter drops its reference to the master password when the export
+        finishes, so each exporter runs a single export.
+
         Returns:
             ExportResult with statistics about the export operation.
 
         Raises:
-            RuntimeError: If export fails.
+            RuntimeError: If export fails, or if this exporter already ran.
         """
+        if self.password is None:
+            msg = "Master password already released by a previous export"
+            raise RuntimeError(msg)
+
         result = ExportResult()
 
         try:
@@ -97,30 +217,44 @@ class KeyringExporter:
             if self.create_backup and self.output_path.exists():
                 self._create_backup()
 
-            # Read keyring entries
+            # With a secret cache, the database is needed while reading to tell
+            # which keyring items are already exported
+            cache = None
+            mgr = None
+            is_unchanged = None
+            if self.cache_path is not None:
+                cache = SecretCache(self.cache_path, self.password)
+                # Renaming always adds a copy, so every item has to be read
+                if self.conflict_resolution != ConflictResolution.RENAME:
+                    mgr = self._open_database()
+                    is_unchanged = self._unchanged_check(mgr, cache, result)
+
+            # Read keyring entries lazily, so each one is processed as soon as
+            # the keyring returns it
             logger.info("Reading keyring credentials...")
-            entries = self.keyring_reader.get_all_credentials()
-            result.total = len(entries)
-            logger.info(f"Found {result.total} keyring entries")
+            entries = iter(self.keyring_reader.iter_all_credentials(is_unchanged))
+            first = next(entries, None)
 
-            if result.total == 0:
+            if first is None and result.skipped == 0:
                 logger.warning("No credentials found in keyring")
                 return result
 
             # Initialise KDBX manager
-            create = not self.output_path.exists()
-            self.kdbx_manager = KdbxManager(self.output_path, self.password, create=create)
+            if mgr is None:
+                mgr = self._open_database()
 
-            # Export each entry
-            for entry in entries:
-                try:
-                    self._export_entry(entry, result)
-                except Exception as e:
-                    logger.error(f"Failed to export {entry.service}/{entry.username}: {e}")
-                    result.errors += 1
+            if first is not None:
+                entries = itertools.chain((first,), entries)
+            if cache is not None:
+                entries = self._record_in_cache(cache, entries)
+
+            self._export_entries(mgr, entries, result)
 
             # Save the database
-            self.kdbx_manager.save()
+            mgr.save()
+
+            if cache is not None:
+                cache.save()
 
             logger.info(str(result))
             return result
@@ -132,138 +266,262 @@ class KeyringExporter:
         finally:
             if self.kdbx_manager:
                 self.kdbx_manager.close()
+            self.password = None
+            # Don't keep keyring passwords in memory past the export either
+            self.keyring_reader.clear_cache()
+
+    def _open_database(self) -> KdbxManager:
+        """
+        Open the output database, creating it if it doesn't exist.
+
+        Returns:
+            The KDBX manager of the export in progress.
+        """
+        create = not self.output_path.exists()
+        mgr = self.kdbx_manager = KdbxManager(
+            self.output_path, self.password, create=create, kdf_params=self.kdf_params
+        )
+        if self.group_strategy != GroupStrategy.FLAT:
+            mgr.prewarm_groups()
+        return mgr
+
+    def _unchanged_check(
+        self, mgr: KdbxManager, cache: SecretCache, result: ExportResult
+    ) -> Callable[[str, str, float], bool]:
+        """
+        Build the check the keyring reader uses to skip already exported items.
+
+        Args:
+            mgr: The KDBX manager of the export in progress.
+            cache: The secret cache of the previous export.
+            result: Result object to update with statistics.
+
+        Returns:
+            A function telling whether a keyring item is unchanged since the last
+            export and still stored in the database.
+        """
+
+        def is_unchanged(service: str, username: str, modified: float) -> bool:
+            existing = mgr.find_entry(service, username, self._get_group_name(service))
+            if existing is None or not cache.is_current(
+                service, username, modified, existing.password
+            ):
+                return False
+
+            logger.debug("Skipping unchanged entry: %s/%s", service, username)
+            result.total += 1
+            result.skipped += 1
+            return True
+
+        return is_unchanged
+
+    @staticmethod
+    def _record_in_cache(
+        cache: SecretCache, entries: Iterator[KeyringEntry]
+    ) -> Iterator[KeyringEntry]:
+        """
+        Remember keyring items in the secret cache as they pass through.
+
+        Args:
+            cache: The secret cache of the export in progress.
+            entries: The keyring entries being exported.
 
-    def _export_entry(self, entry: KeyringEntry, result: ExportResult) -> None:
+        Yields:
+            The same entries.
+        """
+        for entry in entries:
+            if entry.modified is not None:
+                cache.record(entry.service, entry.username, entry.modified, entry.password)
+            yield entry
+
+    def _export_entries(
+        self, mgr: KdbxManager, entries: Iterator[KeyringEntry], result: ExportResult
+    ) -> None:
+        """
+        Export keyring entries to KDBX as they are read.
+
+        Args:
+            mgr: The KDBX manager of the export in progress.
+            entries: The keyring entries to export.
+            result: Result object to update with statistics.
+        """
+        # Sort each entry into the add or update batch
+        self._new_entries = {}
+        self._updates = {}
+        for entry in entries:
+            result.total += 1
+            try:
+                self._export_entry(mgr, entry, result)
+            except Exception as e:
+                logger.error("Failed to export %s/%s: %s", entry.service, entry.username, e)
+                result.errors += 1
+        logger.info("Read %s keyring entries", result.total)
+
+        # Write both batches
+        self._flush(mgr, result)
+
+    def _export_entry(self, mgr: KdbxManager, entry: KeyringEntry, result: ExportResult) -> None:
         """
         Export a single keyring entry to KDBX.
 
         Args:
+            mgr: The KDBX manager of the export in progress.
             entry: The keyring entry to export.
             result: Result object to update with statistics.
         """
-        if self.kdbx_manager is None:
-            msg = "KDBX manager not initialized"
-            raise RuntimeError(msg)
-
         # Determine group name
         group_name = self._get_group_name(entry.service)
 
+        # Write queued entries first if this one duplicates one of them, so the
+        # duplicate is found below and handled as a conflict
+        if _queue_key(entry.service, entry.username, group_name) in self._new_entries:
+            self._flush(mgr, result)
+
         # Check if entry already exists
-        existing = self.kdbx_manager.find_entry(entry.service, entry.username, group_name)
+        existing = mgr.find_entry(entry.service, entry.username, group_name)
 
         if existing:
-            self._handle_conflict(entry, existing, group_name, result)
+            self._handle_conflict(mgr, entry, existing, group_name, result)
         else:
-            # Add new entry
+            # Queue new entry
             notes = "Exported from system keyring"
-            self.kdbx_manager.add_entry(
-                service=entry.service,
-                username=entry.username,
-                password=entry.password,
-                group_name=group_name,
-                notes=notes,
-                attributes=entry.attributes,
-            )
-            result.added += 1
-            logger.debug(f"Added entry: {entry.service}/{entry.username}")
-
-    def _handle_conflict(
+            self._queue_entry(mgr, _entry_spec(entry.service, entry, group_name, notes), result)
+
+    def _skip_conflict(
         self,
+        _mgr: KdbxManager,
+        entry: KeyringEntry,
+        _existing: "Entry",
+        _group_name: str | None,
+        result: ExportResult,
+    ) -> None:
+        """
+        Handle a conflict by keeping the existing entry.
+
+        Args:
+            entry: The new keyring entry.
+            result: Result object to update with statistics.
+        """
+        logger.debug("Skipping existing entry: %s/%s", entry.service, entry.username)
+        result.skipped += 1
+
+    def _overwrite_conflict(
+        self,
+        mgr: KdbxManager,
         entry: KeyringEntry,
         existing: "Entry",
-        group_name: str | None,
+        _group_name: str | None,
         result: ExportResult,
     ) -> None:
         """
-        Handle a conflict when an entry already exists.
+        Handle a conflict by queueing an update of the existing entry.
 
         Args:
+            mgr: The KDBX manager of the export in progress.
             entry: The new keyring entry.
             existing: The existing KDBX entry.
-            group_name: The group name for the entry.
             result: Result object to update with statistics.
         """
-        if self.kdbx_manager is None:
-            msg = "KDBX manager not initialised"
-            raise RuntimeError(msg)
-
-        if self.conflict_resolution == ConflictResolution.SKIP:
-            logger.debug(f"Skipping existing entry: {entry.service}/{entry.username}")
+        # Write a queued update of the same entry first, so the entry is compared
+        # with, and then overwritten after, the keyring item that came before
+        if existing.uuid in self._updates:
+            self._flush(mgr, result)
+
+        notes = "Exported from system keyring (updated)"
+        if existing.password == entry.password and existing.notes == notes:
+            logger.debug("Entry unchanged, skipping: %s/%s", entry.service, entry.username)
             result.skipped += 1
+            return
+
+        logger.debug("Overwriting entry: %s/%s", entry.service, entry.username)
+        self._updates[existing.uuid] = (existing, {"password": entry.password, "notes": notes})
 
-        elif self.conflict_resolution == ConflictResolution.OVERWRITE:
-            logger.debug(f"Overwriting entry: {entry.service}/{entry.username}")
-            notes = "Exported from system keyring (updated)"
-            self.kdbx_manager.update_entry(existing, password=entry.password, notes=notes)
-            result.updated += 1
-
-        elif self.conflict_resolution == ConflictResolution.RENAME:
-            # Add with a renamed title
-            new_service = f"{entry.service} (keyring)"
-            logger.debug(f"Renaming entry: {entry.service} -> {new_service}")
-            notes = "Exported from system keyring (renamed to avoid conflict)"
-            self.kdbx_manager.add_entry(
-                service=new_service,
-                username=entry.username,
-                password=entry.password,
-                group_name=group_name,
-                notes=notes,
-                attributes=entry.attributes,
-            )
-            result.added += 1
-
-    def _get_group_name(self, service: str) -> str | None:
+    def _rename_conflict(
+        self,
+        mgr: KdbxManager,
+        entry: KeyringEntry,
+        _existing: "Entry",
+        group_name: str | None,
+        result: ExportResult,
+    ) -> None:
         """
-        Determine the group name based on the group strategy.
+        Handle a conflict by queueing a copy of the entry under a new title.
 
         Args:
-            service: The service name.
+            mgr: The KDBX manager of the export in progress.
+            entry: The new keyring entry.
+            group_name: The group name for the entry.
+            result: Result object to update with statistics.
+        """
+        new_service = f"{entry.service} (keyring)"
+        logger.debug("Renaming entry: %s -> %s", entry.service, new_service)
+        notes = "Exported from system keyring (renamed to avoid conflict)"
+        self._queue_entry(mgr, _entry_spec(new_service, entry, group_name, notes), result)
 
-        Returns:
-            Group name, or None for flat structure.
+    def _queue_entry(self, mgr: KdbxManager, spec: dict[str, Any], result: ExportResult) -> None:
+        """
+        Queue an entry to be added to the database on the next flush.
+
+        Args:
+            mgr: The KDBX manager of the export in progress.
+            spec: The entry specification, as accepted by KdbxManager.add_entries().
+            result: Result object to update with statistics.
         """
-        if self.group_strategy == GroupStrategy.FLAT:
-            return None
+        key = _queue_key(spec["service"], spec["username"], spec["group_name"])
+        if key in self._new_entries:
+            self._flush(mgr, result)
 
-        if self.group_strategy == GroupStrategy.SERVICE:
-            # Use service name as group
-            return service
+        self._new_entries[key] = spec
 
-        if self.group_strategy == GroupStrategy.DOMAIN:
-            # Try to extract domain from service name
-            # Common patterns: "https://example.com", "example.com", etc.
-            service_lower = service.lower()
+    def _flush(self, mgr: KdbxManager, result: ExportResult) -> None:
+        """
+        Write queued additions and updates to the database.
 
-            # Remove common prefixes
-            for prefix in ["https://", "http://", "www."]:
-                if service_lower.startswith(prefix):
-                    service_lower = service_lower[len(prefix) :]
+        Args:
+            mgr: The KDBX manager of the export in progress.
+            result: Result object to update with statistics.
+        """
 
-            # Take first part (domain)
-            domain = service_lower.split("/")[0].split(":")[0]
+        def on_add_error(spec: dict[str, Any], error: Exception) -> None:
+            logger.error("Failed to export %s/%s: %s", spec["service"], spec["username"], error)
+            result.errors += 1
 
-            # If it looks like a domain, use it
-            if "." in domain or domain in ["localhost", "local"]:
-                return domain
+        def on_update_error(existing: "Entry", error: Exception) -> None:
+            logger.error("Failed to update %s/%s: %s", existing.title, existing.username, error)
+            result.errors += 1
 
-            # Otherwise, fall back to service name
-            return service
+        if self._new_entries:
+            added = mgr.add_entries(list(self._new_entries.values()), on_error=on_add_error)
+            result.added += len(added)
+            logger.debug("Added %s entries", len(added))
+            self._new_entries.clear()
 
-        return None
+        if self._updates:
+            updated = mgr.update_entries(list(self._updates.values()), on_error=on_update_error)
+            result.updated += len(updated)
+            logger.debug("Updated %s entries", len(updated))
+            self._updates.clear()
 
     def _create_backup(self) -> None:
         """Create a backup of the existing KDBX file."""
         if not self.output_path.exists():
             return
 
-        backup_path = self.output_path.with_suffix(self.output_path.suffix + ".backup")
+        prefix = f"{self.output_path.name}.backup"
+        pattern = re.compile(re.escape(prefix) + r"(\d*)")
+
+        # Find existing backups with a single directory scan
+        numbers = []
+        with os.scandir(self.output_path.parent) as it:
+            for dir_entry in it:
+                match = pattern.fullmatch(dir_entry.name)
+                if match:
+                    numbers.append(int(match.group(1) or 0))
 
         # If backup already exists, add number
-        counter = 1
-        while backup_path.exists():
-            backup_path = self.output_path.with_suffix(f"{self.output_path.suffix}.backup{counter}")
-            counter += 1
+        suffix = str(max(numbers) + 1) if numbers else ""
+        backup_path = self.output_path.with_name(prefix + suffix)
 
-        logger.info(f"Creating backup: {backup_path}")
+        logger.info("Creating backup: %s", backup_path)
         self.output_path.rename(backup_path)
         logger.info("Backup created successfully")
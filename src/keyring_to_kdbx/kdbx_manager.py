@@ -1,15 +1,29 @@
 """Module for managing KeePass database (KDBX) operations."""
 
 import logging
+import os
+import tempfile
+from collections.abc import Callable, Mapping
 from pathlib import Path
+from typing import Any
+from uuid import UUID
 
-from pykeepass import PyKeePass, create_database
-from pykeepass.entry import Entry
+from lxml import etree
+from pykeepass import PyKeePass
+from pykeepass.entry import Entry, reserved_keys
 from pykeepass.exceptions import CredentialsError
 from pykeepass.group import Group
+from pykeepass.pykeepass import BLANK_DATABASE_LOCATION, BLANK_DATABASE_PASSWORD
 
 logger = logging.getLogger(__name__)
 
+# KDF parameter names accepted by KdbxManager, mapped to their KDBX 4 header keys
+_KDF_PARAMETER_KEYS = {
+    "argon2": {"iterations": "I", "memory": "M", "parallelism": "P"},
+    "argon2id": {"iterations": "I", "memory": "M", "parallelism": "P"},
+    "aeskdf": {"iterations": "R"},
+}
+
 
 def _sanitize_entry_field(value: str) -> str:
     """
@@ -32,10 +46,44 @@ def _sanitize_entry_field(value: str) -> str:
     return value.replace('"', "")
 
 
+def _bulk_set_custom_properties(entry: Entry, attributes: Mapping[str, str]) -> None:
+    """
+    Add custom properties to a newly created entry in a single pass.
+
+    Entry.set_custom_property() searches the entry for an existing field to
+    replace on every call. A new entry has no custom properties, so the
+    String elements are appended directly instead.
+
+    Args:
+        entry: The entry to add properties to. Must not have custom properties yet.
+        attributes: Property names and values to add.
+
+    Raises:
+        ValueError: If a property name is reserved for a standard entry field.
+    """
+    reserved = attributes.keys() & set(reserved_keys)
+    if reserved:
+        msg = f"{', '.join(sorted(reserved))} is a reserved key"
+        raise ValueError(msg)
+
+    element = entry._element
+    for key, value in attributes.items():
+        string = etree.SubElement(element, "String")
+        etree.SubElement(string, "Key").text = key
+        # Matches what set_custom_property(key, value) writes
+        etree.SubElement(string, "Value", Protected="False").text = value
+
+
 class KdbxManager:
     """Manages KeePass database operations."""
 
-    def __init__(self, db_path: Path, password: str, create: bool = False) -> None:
+    def __init__(
+        self,
+        db_path: Path,
+        password: str,
+        create: bool = False,
+        kdf_params: dict[str, int] | None = None,
+    ) -> None:
         """
         Initialise the KDBX manager.
 
@@ -43,55 +91,97 @@ class KdbxManager:
             db_path: Path to the KDBX database file.
             password: Master password for the database.
             create: If True, create a new database. If False, open existing.
+            kdf_params: Optional key derivation settings to save the database with:
+                "iterations", and for Argon2 also "memory" (in KiB) and
+                "parallelism". Lower values make opening and saving faster but
+                make the master password cheaper to brute-force.
 
         Raises:
             FileNotFoundError: If database doesn't exist and create=False.
             CredentialsError: If password is incorrect for existing database.
             RuntimeError: If database operations fail.
+            ValueError: If kdf_params doesn't match the database's KDF.
         """
         self.db_path = db_path
-        self.password = password
+        # The master password is not kept here; PyKeePass holds the only
+        # reference needed to save, and close() releases it
         self.kp: PyKeePass | None = None
+        # Resolved groups keyed by (parent UUID, name); pykeepass rebuilds Group
+        # wrappers on every lookup, so the UUID is the only stable identity
+        self._group_cache: dict[tuple[UUID, str], Group] = {}
+        # After prewarm_groups(), every group by name (first in document order, as
+        # find_groups() would return it), so missing groups need no tree search
+        self._groups_by_name: dict[str, Group] | None = None
+        self._root_group: Group | None = None
+        # Entries keyed by (title, username, group UUID), plus a group-agnostic
+        # view keyed by (title, username); built on first lookup
+        self._entry_index: dict[tuple[str, str, UUID], Entry] | None = None
+        self._entries_by_key: dict[tuple[str, str], list[Entry]] = {}
+        # Whether the in-memory database has changes not yet written to disk
+        self._dirty = False
+        # Entry and group totals, counted once and then kept up to date by the
+        # methods that add entries and groups
+        self._entry_count: int | None = None
+        self._group_count: int | None = None
 
         if create:
             if db_path.exists():
-                logger.warning(f"Database already exists at {db_path}")
+                logger.warning("Database already exists at %s", db_path)
                 # Open existing instead of creating
-                self._open_database()
+                self._open_database(password)
             else:
-                self._create_database()
+                self._create_database(password)
         else:
-            self._open_database()
+            self._open_database(password)
+
+        if kdf_params:
+            self._apply_kdf_params(kdf_params)
 
-    def _create_database(self) -> None:
-        """Create a new KeePass database."""
+    def _create_database(self, password: str) -> None:
+        """
+        Create a new KeePass database.
+
+        Like pykeepass' create_database(), the database starts as a copy of the
+        blank database bundled with pykeepass, which still costs one key
+        derivation to open. Unlike it, the new database is not saved here, which
+        would derive the key and serialise the database once more: the first
+        save() is its only serialisation and disk write.
+
+        Args:
+            password: Master password for the database.
+        """
         try:
             # Ensure parent directory exists
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
-            logger.info(f"Creating new database at {self.db_path}")
-            self.kp = create_database(
-                str(self.db_path),
-                password=self.password,
-                keyfile=None,
-            )
+            logger.info("Creating new database at %s", self.db_path)
+            self.kp = PyKeePass(BLANK_DATABASE_LOCATION, BLANK_DATABASE_PASSWORD)
+            self.kp.filename = str(self.db_path)
+            self.kp.password = password
+            self.kp.keyfile = None
+            self._dirty = True
             logger.info("Database created successfully")
         except Exception as e:
             msg = f"Failed to create database: {e}"
             logger.error(msg)
             raise RuntimeError(msg) from e
 
-    def _open_database(self) -> None:
-        """Open an existing KeePass database."""
+    def _open_database(self, password: str) -> None:
+        """
+        Open an existing KeePass database.
+
+        Args:
+            password: Master password for the database.
+        """
         if not self.db_path.exists():
             msg = f"Database not found at {self.db_path}"
             raise FileNotFoundError(msg)
 
         try:
-            logger.info(f"Opening database at {self.db_path}")
+            logger.info("Opening database at %s", self.db_path)
             self.kp = PyKeePass(
                 str(self.db_path),
-                password=self.password,
+                password=password,
                 keyfile=None,
             )
             logger.info("Database opened successfully")
@@ -104,6 +194,37 @@ class KdbxManager:
             logger.error(msg)
             raise RuntimeError(msg) from e
 
+    def _apply_kdf_params(self, kdf_params: dict[str, int]) -> None:
+        """
+        Set the key derivation parameters used when the database is saved.
+
+        Args:
+            kdf_params: Parameter values keyed by "iterations", "memory" or "parallelism".
+
+        Raises:
+            ValueError: If a parameter is not supported by the database's KDF.
+        """
+        if self.kp.version != (4, 0):
+            msg = "KDF parameters can only be changed on KDBX 4 databases"
+            raise ValueError(msg)
+
+        kdf = self.kp.kdf_algorithm
+        keys = _KDF_PARAMETER_KEYS[kdf]
+        unsupported = sorted(set(kdf_params) - set(keys))
+        if unsupported:
+            msg = f"Unsupported {kdf} KDF parameters: {', '.join(unsupported)}"
+            raise ValueError(msg)
+
+        header = self.kp.kdbx.header.value.dynamic_header.kdf_parameters.data.dict
+        for name, value in kdf_params.items():
+            # The header stores Argon2 memory in bytes
+            header_value = value * 1024 if name == "memory" else value
+            if header[keys[name]].value != header_value:
+                header[keys[name]].value = header_value
+                self._dirty = True
+
+        logger.debug("Using %s KDF parameters: %s", kdf, kdf_params)
+
     def get_or_create_group(self, group_name: str, parent: Group | None = None) -> Group:
         """
         Get an existing group or create a new one.
@@ -122,19 +243,86 @@ class KdbxManager:
             msg = "Database not initialised"
             raise RuntimeError(msg)
 
-        parent_group = parent or self.kp.root_group
+        parent_group = parent or self._get_root_group()
 
         # Try to find existing group
-        group = self.kp.find_groups(name=group_name, first=True)
+        group = self._find_group(group_name, parent_group)
 
         if group is None:
-            logger.debug(f"Creating group: {group_name}")
+            logger.debug("Creating group: %s", group_name)
             group = self.kp.add_group(parent_group, group_name)
-        else:
-            logger.debug(f"Using existing group: {group_name}")
+            self._dirty = True
+            if self._group_count is not None:
+                self._group_count += 1
+            self._group_cache[(parent_group.uuid, group_name)] = group
+            if self._groups_by_name is not None:
+                self._groups_by_name.setdefault(group_name, group)
+
+        return group
+
+    def _get_root_group(self) -> Group:
+        """Return the root group, looking it up only once per database session."""
+        if self._root_group is None:
+            self._root_group = self.kp.root_group
+        return self._root_group
+
+    def _find_group(self, group_name: str, parent_group: Group) -> Group | None:
+        """
+        Find an existing group, consulting the group cache first.
+
+        Args:
+            group_name: Name of the group.
+            parent_group: Parent group the lookup is made for.
+
+        Returns:
+            The group if found, None otherwise.
+        """
+        key = (parent_group.uuid, group_name)
+        group = self._group_cache.get(key)
+        if group is not None:
+            return group
+
+        # Every group is known after prewarm_groups(), so a miss needs no search
+        if self._groups_by_name is not None:
+            return self._groups_by_name.get(group_name)
+
+        group = self.kp.find_groups(name=group_name, first=True)
+        if group is not None:
+            logger.debug("Using existing group: %s", group_name)
+            self._group_cache[key] = group
 
         return group
 
+    def prewarm_groups(self) -> None:
+        """
+        Populate the group cache from the database in a single pass.
+
+        Subsequent group lookups by get_or_create_group() and find_entry() are
+        then resolved without searching the database tree, whether or not the
+        group exists.
+
+        Raises:
+            RuntimeError: If database is not initialised.
+        """
+        if self.kp is None:
+            msg = "Database not initialised"
+            raise RuntimeError(msg)
+
+        groups = self.kp.groups
+        groups_by_name: dict[str, Group] = {}
+        for group in groups:
+            # Like find_groups(), lookups by name also match the root group
+            groups_by_name.setdefault(group.name, group)
+            parent = group.parentgroup
+            if parent is None:
+                self._root_group = group
+                continue
+            self._group_cache.setdefault((parent.uuid, group.name), group)
+        self._groups_by_name = groups_by_name
+        self._group_count = len(groups)
+
+        logger.debug("Cached %s groups", len(self._group_cache))
+
     def add_entry(
         self,
         service: str,
@@ -143,7 +331,7 @@ class KdbxManager:
         group_name: str | None = None,
         notes: str | None = None,
         url: str | None = None,
-        attributes: dict[str, str] | None = None,
+        attributes: Mapping[str, str] | None = None,
     ) -> Entry:
         """
         Add a new entry to the database.
@@ -155,7 +343,7 @@ class KdbxManager:
             group_name: Group to add entry to. If None, uses root group.
             notes: Optional notes for the entry.
             url: Optional URL for the entry.
-            attributes: Optional dict of custom attributes from keyring to preserve.
+            attributes: Optional mapping of custom attributes from keyring to preserve.
 
         Returns:
             The created entry.
@@ -170,26 +358,134 @@ class KdbxManager:
         # Get or create the group
         group = self.get_or_create_group(group_name) if group_name else self.kp.root_group
 
-        logger.debug(f"Adding entry: {service}/{username}")
+        return self._add_entry_to_group(
+            group, service, username, password, notes=notes, url=url, attributes=attributes
+        )
+
+    def add_entries(
+        self,
+        batch: list[dict[str, Any]],
+        on_error: Callable[[dict[str, Any], Exception], None] | None = None,
+    ) -> list[Entry]:
+        """
+        Add several entries to the database.
+
+        Groups are resolved once per distinct group name rather than once per entry.
+
+        Args:
+            batch: Entry specifications, each holding the keyword arguments of add_entry().
+            on_error: Optional callback receiving the specification and exception of an
+                entry that could not be added. If None, the exception is raised.
+
+        Returns:
+            The created entries.
+
+        Raises:
+            RuntimeError: If database is not initialised.
+        """
+        if self.kp is None:
+            msg = "Database not initialised"
+            raise RuntimeError(msg)
+
+        groups: dict[str | None, Group] = {}
+        added = []
+        for spec in batch:
+            try:
+                group_name = spec.get("group_name")
+                group = groups.get(group_name)
+                if group is None:
+                    group = (
+                        self.get_or_create_group(group_name) if group_name else self.kp.root_group
+                    )
+                    groups[group_name] = group
+
+                entry = self._add_entry_to_group(
+                    group,
+                    spec["service"],
+                    spec["username"],
+                    spec["password"],
+                    notes=spec.get("notes"),
+                    url=spec.get("url"),
+                    attributes=spec.get("attributes"),
+                )
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(spec, e)
+            else:
+                added.append(entry)
+
+        return added
+
+    def _add_entry_to_group(
+        self,
+        group: Group,
+        service: str,
+        username: str,
+        password: str,
+        *,
+        notes: str | None,
+        url: str | None,
+        attributes: Mapping[str, str] | None,
+    ) -> Entry:
+        """
+        Add a new entry to an already resolved group.
+
+        Args:
+            group: Group to add the entry to.
+            service: Service name (used as title).
+            username: Username for the service.
+            password: Password for the service.
+            notes: Optional notes for the entry.
+            url: Optional URL for the entry.
+            attributes: Optional mapping of custom attributes from keyring to preserve.
+
+        Returns:
+            The created entry.
+        """
+        logger.debug("Adding entry: %s/%s", service, username)
 
         # Sanitize title to avoid XPath issues (username kept unchanged)
         safe_service = _sanitize_entry_field(service)
 
-        entry = self.kp.add_entry(
-            destination_group=group,
-            title=safe_service,
-            username=username,
-            password=password,
-            notes=notes or "",
-            url=url or "",
-        )
+        # Once the entry index exists, duplicates are detected there. pykeepass's
+        # add_entry() searches the group for a duplicate even with force_creation,
+        # so the entry is then built and appended to the group directly.
+        indexed = self._entry_index is not None
+        if indexed:
+            if (safe_service, username, group.uuid) in self._entry_index:
+                msg = f'An entry "{safe_service}" already exists in "{group.name}"'
+                raise RuntimeError(msg)
+            entry = Entry(
+                title=safe_service,
+                username=username,
+                password=password,
+                notes=notes or "",
+                url=url or "",
+                kp=self.kp,
+            )
+            group.append(entry)
+        else:
+            entry = self.kp.add_entry(
+                destination_group=group,
+                title=safe_service,
+                username=username,
+                password=password,
+                notes=notes or "",
+                url=url or "",
+            )
+
+        self._dirty = True
+        if self._entry_count is not None:
+            self._entry_count += 1
+        if indexed:
+            self._index_entry(entry, safe_service, username, group.uuid)
 
         # Preserve original keyring attributes as custom properties
         # This maintains Secret Service compatibility for KeePassXC
         if attributes:
-            for key, value in attributes.items():
-                entry.set_custom_property(key, value)
-            logger.debug(f"Preserved {len(attributes)} original attributes from keyring")
+            _bulk_set_custom_properties(entry, attributes)
+            logger.debug("Preserved %s original attributes from keyring", len(attributes))
 
         return entry
 
@@ -220,26 +516,56 @@ class KdbxManager:
         # Sanitize title to match what was stored (username kept unchanged)
         safe_service = _sanitize_entry_field(service)
 
-        # Search for the entry
-        group = None
+        entry_index = self._build_entry_index()
+
+        # If group specified and it exists, only match entries in that group
         if group_name:
-            group = self.kp.find_groups(name=group_name, first=True)
+            group = self._find_group(group_name, self._get_root_group())
+            if group is not None:
+                return entry_index.get((safe_service, username, group.uuid))
 
-        # Search for entry using sanitized title
-        entries = self.kp.find_entries(title=safe_service, username=username, first=False)
+        # Return first match
+        entries = self._entries_by_key.get((safe_service, username))
+        return entries[0] if entries else None
 
-        if not entries:
-            return None
+    def _build_entry_index(self) -> dict[tuple[str, str, UUID], Entry]:
+        """
+        Build the entry indexes from the database in a single pass.
 
-        # If group specified, filter by group
-        if group:
-            for entry in entries:
-                if entry.group == group:
-                    return entry
-            return None
+        Returns:
+            The entry index keyed by (title, username, group UUID).
+        """
+        if self._entry_index is None:
+            self._entry_index = {}
+            self._entries_by_key = {}
+            # Walk entries group by group so each entry's group is known without
+            # the ancestor search behind Entry.group
+            groups = self.kp.groups
+            entry_count = 0
+            for group in groups:
+                group_uuid = group.uuid
+                entries = group.entries
+                entry_count += len(entries)
+                for entry in entries:
+                    self._index_entry(entry, entry.title, entry.username, group_uuid)
+            self._entry_count = entry_count
+            self._group_count = len(groups)
+            logger.debug("Indexed %s entries", len(self._entry_index))
+
+        return self._entry_index
+
+    def _index_entry(self, entry: Entry, title: str, username: str, group_uuid: UUID) -> None:
+        """
+        Record an entry in the entry indexes.
 
-        # Return first match
-        return entries[0] if entries else None
+        Args:
+            entry: The entry to index.
+            title: Title of the entry.
+            username: Username of the entry.
+            group_uuid: UUID of the group containing the entry.
+        """
+        self._entry_index.setdefault((title, username, group_uuid), entry)
+        self._entries_by_key.setdefault((title, username), []).append(entry)
 
     def update_entry(
         self,
@@ -261,13 +587,58 @@ class KdbxManager:
             msg = "Database not initialised"
             raise RuntimeError(msg)
 
-        logger.debug(f"Updating entry: {entry.title}/{entry.username}")
+        fields = {"password": password, "notes": notes, "url": url}
+        changes = {
+            name: value
+            for name, value in fields.items()
+            if value is not None and getattr(entry, name) != value
+        }
+        if not changes:
+            logger.debug("Entry unchanged: %s/%s", entry.title, entry.username)
+            return
+
+        logger.debug("Updating entry: %s/%s", entry.title, entry.username)
+
+        # Only real changes mark the database for saving
+        self._dirty = True
+        for name, value in changes.items():
+            setattr(entry, name, value)
+
+    def update_entries(
+        self,
+        updates: list[tuple[Entry, dict[str, Any]]],
+        on_error: Callable[[Entry, Exception], None] | None = None,
+    ) -> list[Entry]:
+        """
+        Update several existing entries.
+
+        Args:
+            updates: Pairs of entry and the keyword arguments of update_entry() to apply.
+            on_error: Optional callback receiving the entry and exception of an update
+                that failed. If None, the exception is raised.
+
+        Returns:
+            The updated entries.
+
+        Raises:
+            RuntimeError: If database is not initialised.
+        """
+        if self.kp is None:
+            msg = "Database not initialised"
+            raise RuntimeError(msg)
+
+        updated = []
+        for entry, fields in updates:
+            try:
+                self.update_entry(entry, **fields)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(entry, e)
+            else:
+                updated.append(entry)
 
-        entry.password = password
-        if notes is not None:
-            entry.notes = notes
-        if url is not None:
-            entry.url = url
+        return updated
 
     def save(self) -> None:
         """
@@ -280,15 +651,41 @@ class KdbxManager:
             msg = "Database not initialised"
             raise RuntimeError(msg)
 
+        if not self._dirty:
+            logger.info("No changes to save")
+            return
+
         try:
-            logger.info(f"Saving database to {self.db_path}")
-            self.kp.save()
+            logger.info("Saving database to %s", self.db_path)
+            self._write_atomically()
+            self._dirty = False
             logger.info("Database saved successfully")
         except Exception as e:
             msg = f"Failed to save database: {e}"
             logger.error(msg)
             raise RuntimeError(msg) from e
 
+    def _write_atomically(self) -> None:
+        """Write the database to a temporary file and move it over the target path."""
+        with tempfile.NamedTemporaryFile(
+            dir=self.db_path.parent,
+            prefix=f".{self.db_path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+            try:
+                self.kp.save(tmp)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            except BaseException:
+                tmp.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+        # Atomic on POSIX and Windows, so a crash never leaves a truncated database
+        tmp_path.replace(self.db_path)
+
     def get_entry_count(self) -> int:
         """
         Get the total number of entries in the database.
@@ -303,7 +700,9 @@ class KdbxManager:
             msg = "Database not initialised"
             raise RuntimeError(msg)
 
-        return len(self.kp.entries)
+        if self._entry_count is None:
+            self._entry_count = len(self.kp.entries)
+        return self._entry_count
 
     def get_group_count(self) -> int:
         """
@@ -319,10 +718,32 @@ class KdbxManager:
             msg = "Database not initialised"
             raise RuntimeError(msg)
 
-        return len(self.kp.groups)
+        if self._group_count is None:
+            self._group_count = len(self.kp.groups)
+        return self._group_count
 
     def close(self) -> None:
-        """Close the database connection."""
+        """
+        Close the database connection.
+
+        This also drops the master password, so the manager can't save again
+        afterwards; open a new KdbxManager instead.
+
+        Dropping the password only removes this object's references to it. Python
+        strings can't be wiped, so the text stays in memory until it is garbage
+        collected, along with any copy the caller keeps and the key pykeepass
+        derived from it, which the parsed database holds until it is released.
+        """
         if self.kp is not None:
             logger.info("Closing database")
+            # Cleared behind the password setter, which would also bump the
+            # database's credentials change date
+            self.kp._password = None
             self.kp = None
+        self._group_cache.clear()
+        self._groups_by_name = None
+        self._root_group = None
+        self._entry_index = None
+        self._entries_by_key = {}
+        self._entry_count = None
+        self._group_count = None
@@ -2,211 +2,677 @@
 
 import contextlib
 import logging
-from collections.abc import Iterator
-from dataclasses import dataclass
+import types
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum, auto
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, TypeVar
 
-import keyring
-from keyring.backend import KeyringBackend
-from keyring.backends.fail import Keyring as FailKeyring
+if TYPE_CHECKING:
+    from keyring.backend import KeyringBackend
 
-# Optional secretstorage for better SecretService support
-try:
-    import secretstorage
-
-    HAS_SECRETSTORAGE = True
-except ImportError:
-    HAS_SECRETSTORAGE = False
+# Optional secretstorage for better SecretService support. It is only imported
+# by readers that use it, as importing it pulls in the D-Bus and crypto stacks.
+HAS_SECRETSTORAGE = find_spec("secretstorage") is not None
 
 logger = logging.getLogger(__name__)
 
+# Number of credentials without a password remembered by a reader before the
+# record of them is dropped
+_MISS_CACHE_SIZE = 4096
+
+# Number of passwords get_credential() remembers before they are all dropped
+_PASSWORD_CACHE_SIZE = 512
+
+# Check telling whether a keyring item (service, username, modification time)
+# can be skipped because it is unchanged since the last export
+_UnchangedCheck = Callable[[str, str, float], bool]
+
+# Credential as read from the backend: service, username, password, attributes
+# and modification time. KeyringEntry objects are only built from rows when a
+# caller asks for them.
+_Row = tuple[str, str, str, Mapping[str, str] | None, float | None]
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
 
-@dataclass
+# Representation of KeyringEntry objects, formatted in a single operation
+_ENTRY_REPR_TEMPLATE = "KeyringEntry(service=%r, username=%r, password='***')"
+
+
+@dataclass(slots=True, frozen=True)
 class KeyringEntry:
     """Represents a single keyring entry with service, username, password, and attributes."""
 
     service: str
     username: str
     password: str
-    attributes: dict[str, str] | None = None
+    # Left out of the hash, as attribute mappings are not hashable
+    attributes: Mapping[str, str] | None = field(default=None, hash=False)
+    modified: float | None = None
 
     def __repr__(self) -> str:
         """Return a string representation without exposing the password."""
-        return f"KeyringEntry(service={self.service!r}, username={self.username!r}, password='***')"
+        return _ENTRY_REPR_TEMPLATE % (self.service, self.username)
+
+
+class _BackendKind(IntEnum):
+    """How credentials can be enumerated from a keyring backend."""
+
+    GET_ALL = auto()
+    SECRETSTORAGE = auto()
+    COLLECTION = auto()
+    MACOS = auto()
+    WINDOWS = auto()
+    UNSUPPORTED = auto()
+
+
+# Could potentially use subprocess to call 'security dump-keychain' on macOS, or
+# win32cred on Windows, but these need extra permissions, parsing or dependencies
+_UNSUPPORTED_MESSAGES = {
+    _BackendKind.MACOS: (
+        "macOS Keychain backend detected. Direct enumeration not supported.\n"
+        "Please use macOS security command or specify credentials manually."
+    ),
+    _BackendKind.WINDOWS: (
+        "Windows Credential Manager backend detected. Direct enumeration not supported.\n"
+        "Please use Windows cmdkey or specify credentials manually."
+    ),
+}
+
+
+def _classify_backend(backend: "KeyringBackend") -> _BackendKind:
+    """
+    Work out how credentials can be enumerated from a backend.
+
+    Args:
+        backend: The keyring backend.
+
+    Returns:
+        The kind of the backend.
+    """
+    # Try Secret Service backend (Linux GNOME Keyring, etc.)
+    if hasattr(backend, "get_all_credentials"):
+        return _BackendKind.GET_ALL
+
+    # Try to use secretstorage directly to get all collections (SecretService backend)
+    if HAS_SECRETSTORAGE and hasattr(backend, "get_preferred_collection"):
+        return _BackendKind.SECRETSTORAGE
+
+    # Try to use the collection property (SecretService backend)
+    if getattr(backend, "collection", None) is not None:
+        return _BackendKind.COLLECTION
+
+    return _platform_kind(backend) or _BackendKind.UNSUPPORTED
+
+
+def _platform_kind(backend: "KeyringBackend") -> _BackendKind | None:
+    """
+    Tell whether a backend is one of the platform keyrings that can't enumerate.
+
+    The macOS Keychain and Windows Credential Manager also serialise calls
+    internally, so their lookups gain nothing from running concurrently.
+
+    Args:
+        backend: The keyring backend.
+
+    Returns:
+        MACOS or WINDOWS for those backends, None for any other.
+    """
+    # Imported here, and guarded, as third-party keyring distributions may not
+    # ship every backend
+    with contextlib.suppress(ImportError):
+        from keyring.backends.macOS import Keyring as MacKeyring  # noqa: PLC0415
+
+        if isinstance(backend, MacKeyring):
+            return _BackendKind.MACOS
+
+    with contextlib.suppress(ImportError):
+        from keyring.backends.Windows import WinVaultKeyring  # noqa: PLC0415
+
+        if isinstance(backend, WinVaultKeyring):
+            return _BackendKind.WINDOWS
+
+    return None
+
+
+def _first(attributes: Mapping[str, str], keys: tuple[str, ...], default: str) -> str:
+    """
+    Return the value of the first of several attributes that is present.
+
+    Args:
+        attributes: The item attributes.
+        keys: Attribute names, in order of preference.
+        default: Value returned when none of the attributes is present.
+
+    Returns:
+        The first value found, or the default.
+    """
+    for key in keys:
+        value = attributes.get(key)
+        if value is not None:
+            return value
+    return default
+
+
+def _carried_secret(cred: Any) -> str | None:
+    """
+    Return the secret a credential object already carries, if any.
+
+    Args:
+        cred: A credential returned by a backend's get_all_credentials().
+
+    Returns:
+        The decoded password or secret attribute, or None if there isn't one.
+    """
+    for name in ("password", "secret"):
+        value = getattr(cred, name, None)
+        if isinstance(value, bytes):
+            return value.decode("utf-8", errors="replace")
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _read_item_secret(item: Any, service: str) -> str | None:
+    """
+    Read the secret of a SecretService item.
+
+    Args:
+        item: The secretstorage item.
+        service: Service name of the item, for logging.
+
+    Returns:
+        The decoded secret, or None if it is empty or can't be read.
+    """
+    try:
+        secret_bytes = item.get_secret()
+    except Exception as e:
+        logger.debug("Failed to get secret for %s: %s", service, e)
+        return None
+
+    return secret_bytes.decode("utf-8", errors="replace") if secret_bytes else None
 
 
 class KeyringReader:
     """Reads credentials from the system keyring."""
 
-    def __init__(self) -> None:
-        """Initialise the KeyringReader and verify keyring backend is available."""
+    def __init__(self, max_workers: int = 1) -> None:
+        """
+        Initialise the KeyringReader and verify keyring backend is available.
+
+        Args:
+            max_workers: Number of threads used to read passwords concurrently on
+                backends that allow it: SecretService enumerated through
+                secretstorage, and backends listing their credentials other than
+                the macOS Keychain and Windows Credential Manager. Use 1 to read
+                them one at a time.
+        """
+        # keyring is imported on first use rather than with this module, so
+        # commands that never read the keyring don't pay for it
+        import keyring  # noqa: PLC0415
+        from keyring.backends.fail import Keyring as FailKeyring  # noqa: PLC0415
+
+        self._keyring = keyring
+        self.max_workers = max_workers
+        # Credentials whose password lookup came back empty, not looked up again
+        self._miss_cache: set[tuple[str, str]] = set()
+        # Passwords found by get_credential(), until clear_cache() is called
+        self._password_cache: dict[tuple[str, str], str] = {}
         self.backend: KeyringBackend = keyring.get_keyring()
         if isinstance(self.backend, FailKeyring):
             msg = "No keyring backend available. Please install and configure a keyring service."
             raise RuntimeError(msg)
 
-        logger.info(f"Using keyring backend: {self.backend.__class__.__name__}")
-
-    def get_all_credentials(self) -> list[KeyringEntry]:
+        self._backend_kind = _classify_backend(self.backend)
+        if self._backend_kind is _BackendKind.SECRETSTORAGE:
+            import secretstorage  # noqa: PLC0415
+
+            self._secretstorage = secretstorage
+        # Platform keyrings serialise calls, so their lookups are made in turn
+        self._concurrent_lookups = _platform_kind(self.backend) is None
+        self._iterate_impl = self._select_iterator()
+        # Formatted once, as it is logged on every enumeration attempt
+        self._unsupported_message = _UNSUPPORTED_MESSAGES.get(
+            self._backend_kind,
+            f"Keyring backend '{self.backend.__class__.__name__}' does not support "
+            "credential enumeration.\n"
+            "You may need to manually specify which credentials to export.",
+        )
+
+        logger.info("Using keyring backend: %s", self.backend.__class__.__name__)
+
+    def get_all_credentials(
+        self, is_unchanged: _UnchangedCheck | None = None
+    ) -> list[KeyringEntry]:
         """
         Retrieve all credentials from the system keyring.
 
+        Prefer iter_all_credentials() when the entries can be processed one at a
+        time, so they don't all have to be read before the first is used.
+
+        Args:
+            is_unchanged: Optional check used to skip SecretService items that do
+                not need to be read again, see `_iterate_credentials`.
+
         Returns:
             List of KeyringEntry objects containing service, username, and password.
 
         Raises:
             RuntimeError: If keyring access fails.
         """
-        entries = []
+        entries = list(self.iter_all_credentials(is_unchanged))
+        logger.info("Found %d keyring entries", len(entries))
+        return entries
+
+    def iter_all_credentials(
+        self, is_unchanged: _UnchangedCheck | None = None
+    ) -> Iterator[KeyringEntry]:
+        """
+        Read credentials from the system keyring as they are enumerated.
+
+        Args:
+            is_unchanged: Optional check used to skip SecretService items that do
+                not need to be read again, see `_iterate_credentials`.
+
+        Yields:
+            KeyringEntry objects containing service, username, and password.
+
+        Raises:
+            RuntimeError: If keyring access fails.
+        """
+        for service, username, password, attributes, modified in self._iterate_rows(is_unchanged):
+            yield KeyringEntry(
+                service=service,
+                username=username,
+                password=password,
+                attributes=types.MappingProxyType(attributes) if attributes else None,
+                modified=modified,
+            )
+
+    def iter_triples(self) -> Iterator[tuple[str, str, str]]:
+        """
+        Read the service, username and password of every keyring credential.
+
+        Cheaper than iter_all_credentials() for callers that need neither the
+        attributes nor the modification times, as no KeyringEntry is built.
+
+        Yields:
+            (service, username, password) tuples.
+
+        Raises:
+            RuntimeError: If keyring access fails.
+        """
+        for service, username, password, _attributes, _modified in self._iterate_rows():
+            yield service, username, password
 
+    def _iterate_rows(self, is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Read credentials from the system keyring as rows.
+
+        Args:
+            is_unchanged: Optional check used to skip SecretService items that do
+                not need to be read again, see `_iterate_credentials`.
+
+        Yields:
+            Credential rows.
+
+        Raises:
+            RuntimeError: If keyring access fails.
+        """
         try:
             # Try to get credentials - implementation depends on backend
             # Most keyring backends don't provide a list_credentials method
             # so we need to work with backend-specific methods
-            entries = list(self._iterate_credentials())
-            logger.info(f"Found {len(entries)} keyring entries")
-            return entries
+            yield from self._iterate_credentials(is_unchanged)
         except Exception as e:
             msg = f"Failed to read keyring credentials: {e}"
             logger.error(msg)
             raise RuntimeError(msg) from e
 
-    def _iterate_credentials(self) -> Iterator[KeyringEntry]:  # noqa: PLR0912, PLR0915
+    def _iterate_credentials(self, is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Iterate through credentials using the method chosen for the backend.
+
+        Args:
+            is_unchanged: Called with the service, username and modification time of
+                each SecretService item before its secret is read. Items for which it
+                returns True are left out without being decrypted.
+
+        Returns:
+            Iterator of credential rows.
+        """
+        return self._iterate_impl(is_unchanged)
+
+    def _select_iterator(self) -> Callable[[_UnchangedCheck | None], Iterator[_Row]]:
+        """
+        Choose how credentials are enumerated for the backend kind.
+
+        Returns:
+            The iteration method for the backend.
+        """
+        match self._backend_kind:
+            case _BackendKind.GET_ALL:
+                return self._iterate_get_all
+            case _BackendKind.SECRETSTORAGE:
+                return self._iterate_secretstorage
+            case _BackendKind.COLLECTION:
+                return self._iterate_collection
+            case _:
+                return self._iterate_unsupported
+
+    def _iterate_get_all(self, _is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Iterate through credentials listed by the backend's get_all_credentials().
+
+        Yields:
+            Credential rows.
+        """
+        logger.debug("Using get_all_credentials method")
+        try:
+            credentials = self._unique_credentials(self.backend.get_all_credentials())
+
+            # Only backends known to handle concurrent calls get the thread pool.
+            # Otherwise each credential is yielded as soon as it is looked up.
+            if self._concurrent_lookups and self.max_workers > 1:
+                credentials = list(credentials)
+                passwords = self._map_concurrently(self._read_password, credentials)
+                looked_up = zip(credentials, passwords, strict=True)
+            else:
+                looked_up = ((cred, self._read_password(cred)) for cred in credentials)
+
+            for cred, password in looked_up:
+                if password:
+                    # Extract attributes if available
+                    attributes = {}
+                    if hasattr(cred, "attributes"):
+                        attributes = dict(cred.attributes)
+                    yield cred.service, cred.username, password, attributes, None
+        except Exception as e:
+            logger.warning("get_all_credentials failed: %s", e)
+
+    def _unique_credentials(self, credentials: Iterable[Any]) -> Iterator[Any]:
         """
-        Iterate through credentials using backend-specific methods.
+        Filter listed credentials down to the ones that need looking up.
+
+        Args:
+            credentials: Credentials returned by the backend's get_all_credentials().
 
         Yields:
-            KeyringEntry objects.
+            The first credential listed for every (service, username) pair, unless
+            it is known to have no password.
+        """
+        seen: set[tuple[str, str]] = set()
+        for cred in credentials:
+            if not (hasattr(cred, "service") and hasattr(cred, "username")):
+                continue
+            key = (cred.service, cred.username)
+            if key in seen or key in self._miss_cache:
+                continue
+            seen.add(key)
+            yield cred
+
+    def _read_password(self, cred: Any) -> str | None:
+        """
+        Look up the password of a listed credential, remembering misses.
 
-        Note:
-            This method attempts different approaches based on the backend type.
-            Some backends provide collection methods, others don't.
+        Misses expose no secret, so they can safely be remembered to spare the
+        keyring service repeated lookups on later enumerations.
+
+        Args:
+            cred: The credential, with service and username attributes.
+
+        Returns:
+            The password, or None if there is none or it can't be read.
         """
-        backend_name = self.backend.__class__.__name__
+        try:
+            # Use the secret the credential carries rather than looking it up again
+            password = _carried_secret(cred) or self._keyring.get_password(
+                cred.service, cred.username
+            )
+        except Exception as e:
+            # Only this credential is lost, the others are still read
+            logger.debug("Failed to get password for %s/%s: %s", cred.service, cred.username, e)
+            return None
 
-        # Try Secret Service backend (Linux GNOME Keyring, etc.)
-        if hasattr(self.backend, "get_all_credentials"):
-            logger.debug("Using get_all_credentials method")
-            try:
-                credentials = self.backend.get_all_credentials()
-                for cred in credentials:
-                    if hasattr(cred, "service") and hasattr(cred, "username"):
-                        password = keyring.get_password(cred.service, cred.username)
-                        if password:
-                            # Extract attributes if available
-                            attributes = {}
-                            if hasattr(cred, "attributes"):
-                                attributes = dict(cred.attributes)
-                            yield KeyringEntry(
-                                service=cred.service,
-                                username=cred.username,
-                                password=password,
-                                attributes=attributes if attributes else None,
-                            )
-            except Exception as e:
-                logger.warning(f"get_all_credentials failed: {e}")
+        if not password:
+            if len(self._miss_cache) >= _MISS_CACHE_SIZE:
+                self._miss_cache.clear()
+            self._miss_cache.add((cred.service, cred.username))
+        return password
 
-        # Try to use secretstorage directly to get all collections (SecretService backend)
-        elif HAS_SECRETSTORAGE and hasattr(self.backend, "get_preferred_collection"):
-            logger.debug("Using secretstorage to enumerate all collections")
-            try:
-                connection = secretstorage.dbus_init()
-                collections = list(secretstorage.get_all_collections(connection))
-                logger.debug(f"Found {len(collections)} collections")
+    def _iterate_secretstorage(self, is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Iterate through the items of every unlocked SecretService collection.
 
-                for collection in collections:
-                    if collection.is_locked():
-                        logger.debug(f"Skipping locked collection: {collection.get_label()}")
-                        continue
+        Args:
+            is_unchanged: Optional check used to skip items, see _iterate_credentials().
+
+        Yields:
+            Credential rows.
+        """
+        logger.debug("Using secretstorage to enumerate all collections")
+        try:
+            connection = self._secretstorage.dbus_init()
+            collections = list(self._secretstorage.get_all_collections(connection))
+            logger.debug("Found %d collections", len(collections))
+
+            # Collection labels are fetched over D-Bus, so only when they are logged
+            log_labels = logger.isEnabledFor(logging.DEBUG)
+            for collection in collections:
+                if collection.is_locked():
+                    if log_labels:
+                        logger.debug("Skipping locked collection: %s", collection.get_label())
+                    continue
+
+                if log_labels:
+                    logger.debug("Processing collection: %s", collection.get_label())
+                yield from self._iterate_secretstorage_items(collection, is_unchanged)
+        except Exception as e:
+            logger.warning("secretstorage enumeration failed: %s", e)
+
+    def _iterate_secretstorage_items(
+        self,
+        collection: Any,
+        is_unchanged: _UnchangedCheck | None,
+    ) -> Iterator[_Row]:
+        """
+        Iterate through the items of an unlocked secretstorage collection.
+
+        Args:
+            collection: The collection.
+            is_unchanged: Optional check used to skip items, see _iterate_credentials().
+
+        Yields:
+            Credential rows.
+        """
+        concurrent = self.max_workers > 1
+        candidates = []
+        # Items with identical attributes are the same credential stored twice,
+        # so only the first is read. Items differing in any attribute may hold
+        # different secrets even when their service and username are the same.
+        seen: set[frozenset[tuple[str, str]]] = set()
+        for item in collection.get_all_items():
+            attributes = item.get_attributes()
+            if attributes:
+                key = frozenset(attributes.items())
+                if key in seen:
+                    continue
+                seen.add(key)
+
+            # Extract service from various possible attributes
+            service = (
+                attributes.get("service")
+                or attributes.get("server")
+                or attributes.get("url")
+                or attributes.get("application")
+                or item.get_label()
+            )
 
-                    logger.debug(f"Processing collection: {collection.get_label()}")
-                    for item in collection.get_all_items():
-                        attributes = item.get_attributes()
-
-                        # Extract service from various possible attributes
-                        service = (
-                            attributes.get("service")
-                            or attributes.get("server")
-                            or attributes.get("url")
-                            or attributes.get("application")
-                            or item.get_label()
-                        )
-
-                        # Extract username from various possible attributes
-                        # Use goa-identity for GNOME Online Accounts to avoid duplicates
-                        username = (
-                            attributes.get("username")
-                            or attributes.get("user")
-                            or attributes.get("account")
-                            or attributes.get("goa-identity")
-                            or ""
-                        )
-
-                        # Get secret directly from item
+            # Extract username from various possible attributes
+            # Use goa-identity for GNOME Online Accounts to avoid duplicates
+            username = (
+                attributes.get("username")
+                or attributes.get("user")
+                or attributes.get("account")
+                or attributes.get("goa-identity")
+                or ""
+            )
+
+            modified = None
+            if is_unchanged is not None:
+                modified = item.get_modified()
+                if is_unchanged(service, username, modified):
+                    continue
+
+            if concurrent:
+                candidates.append((item, service, username, attributes, modified))
+                continue
+
+            # Get secret directly from item
+            password = _read_item_secret(item, service)
+            if password:
+                yield service, username, password, attributes, modified
+
+        # With several workers, the secrets of the collection are read together
+        passwords = self._read_items_in_parallel(
+            [(item, service) for item, service, *_ in candidates]
+        )
+        for (_, service, username, attributes, modified), password in zip(
+            candidates, passwords, strict=True
+        ):
+            if password:
+                yield service, username, password, attributes, modified
+
+    def _read_items_in_parallel(self, items: list[tuple[Any, str]]) -> list[str | None]:
+        """
+        Read the secrets of secretstorage items from several threads.
+
+        D-Bus connections are not safe to share between threads, so every worker
+        opens a connection of its own and reads its share of the items over it.
+
+        Args:
+            items: The items, each paired with its service name for logging.
+
+        Returns:
+            The decoded secrets, None for items that can't be read, in the same
+            order as the items.
+        """
+        if not items:
+            return []
+        workers = min(self.max_workers, len(items))
+        secretstorage = self._secretstorage
+
+        def read_share(share: list[tuple[Any, str]]) -> list[str | None]:
+            secrets: list[str | None] = []
+            try:
+                with contextlib.closing(secretstorage.dbus_init()) as connection:
+                    for item, service in share:
                         try:
-                            secret_bytes = item.get_secret()
-                            if secret_bytes:
-                                password = secret_bytes.decode("utf-8", errors="replace")
-
-                                yield KeyringEntry(
-                                    service=service,
-                                    username=username,
-                                    password=password,
-                                    attributes=dict(attributes) if attributes else None,
-                                )
+                            own_item = secretstorage.Item(connection, item.item_path)
                         except Exception as e:
-                            logger.debug(f"Failed to get secret for {service}: {e}")
+                            logger.debug("Failed to open item for %s: %s", service, e)
+                            secrets.append(None)
+                            continue
+                        secrets.append(_read_item_secret(own_item, service))
             except Exception as e:
-                logger.warning(f"secretstorage enumeration failed: {e}")
+                logger.debug("Failed to read secrets over a new D-Bus connection: %s", e)
+            # Items left unread when the connection failed count as unreadable
+            return secrets + [None] * (len(share) - len(secrets))
+
+        passwords: list[str | None] = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            shares = [items[start::workers] for start in range(workers)]
+            for start, secrets in enumerate(executor.map(read_share, shares)):
+                passwords[start::workers] = secrets
+        return passwords
+
+    def _iterate_collection(self, is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Iterate through the items of the backend's collection property.
 
-        # Try to use the collection property (SecretService backend)
-        elif hasattr(self.backend, "collection") and self.backend.collection is not None:
-            logger.debug("Using collection property")
-            try:
-                for item in self.backend.collection.get_all_items():
-                    attributes = item.get_attributes()
-                    service = attributes.get("service", attributes.get("application", "unknown"))
-                    username = attributes.get("username", attributes.get("user", ""))
-
-                    if service and username:
-                        password = keyring.get_password(service, username)
-                        if password:
-                            yield KeyringEntry(
-                                service=service,
-                                username=username,
-                                password=password,
-                                attributes=dict(attributes) if attributes else None,
-                            )
-            except Exception as e:
-                logger.warning(f"Collection iteration failed: {e}")
+        Args:
+            is_unchanged: Optional check used to skip items, see _iterate_credentials().
 
-        # macOS Keychain backend
-        elif "Keychain" in backend_name:
-            logger.warning(
-                "macOS Keychain backend detected. Direct enumeration not supported.\n"
-                "Please use macOS security command or specify credentials manually."
-            )
-            # Could potentially use subprocess to call 'security dump-keychain'
-            # but this requires additional permissions and parsing
-
-        # Windows Credential Manager backend
-        elif "Windows" in backend_name or "Win" in backend_name:
-            logger.warning(
-                "Windows Credential Manager backend detected. Direct enumeration not supported.\n"
-                "Please use Windows cmdkey or specify credentials manually."
-            )
-            # Could potentially use win32cred or subprocess to enumerate
-            # but this is complex and requires additional dependencies
+        Yields:
+            Credential rows.
+        """
+        logger.debug("Using collection property")
+        try:
+            collection = self.backend.collection
+            # Unlock once up front instead of letting every secret read prompt
+            if collection.is_locked():
+                collection.unlock()
+
+            # Items with identical attributes are the same credential stored
+            # twice, so only the first is read
+            seen: set[frozenset[tuple[str, str]]] = set()
+            for item in collection.get_all_items():
+                attributes = item.get_attributes()
+                service = _first(attributes, ("service", "application"), "unknown")
+                username = _first(attributes, ("username", "user"), "")
+
+                key = frozenset(attributes.items())
+                if not (service and username) or key in seen:
+                    continue
+                seen.add(key)
+
+                modified = None
+                if is_unchanged is not None:
+                    modified = item.get_modified()
+                    if is_unchanged(service, username, modified):
+                        continue
 
-        else:
-            logger.warning(
-                f"Keyring backend '{backend_name}' does not support credential enumeration.\n"
-                "You may need to manually specify which credentials to export."
-            )
+                # Read secrets from the enumerated items rather than looking each
+                # one up again through keyring. The items share the backend's
+                # D-Bus connection, which isn't safe to use from several threads,
+                # so they are read one at a time.
+                password = _read_item_secret(item, service)
+                if password:
+                    yield service, username, password, attributes, modified
+        except Exception as e:
+            logger.warning("Collection iteration failed: %s", e)
+
+    def _iterate_unsupported(self, _is_unchanged: _UnchangedCheck | None = None) -> Iterator[_Row]:
+        """
+        Explain that the backend can't enumerate its credentials.
+
+        Returns:
+            An empty iterator.
+        """
+        logger.warning(self._unsupported_message)
+        return iter(())
+
+    def _map_concurrently(self, func: Callable[[_T], _R], items: list[_T]) -> list[_R]:
+        """
+        Apply a blocking keyring call to every item.
+
+        Each call is a separate IPC round trip to the keyring service, so with
+        more than one worker they are issued concurrently from a thread pool.
+
+        Args:
+            func: The call to make for each item.
+            items: The items to call it for.
+
+        Returns:
+            The results, in the same order as the items.
+        """
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
 
     def get_credential(self, service: str, username: str) -> KeyringEntry | None:
         """
         Retrieve a specific credential from the keyring.
 
+        Passwords found are remembered by the reader, so repeated lookups don't
+        go back to the keyring service, until clear_cache() is called.
+
         Args:
             service: The service name.
             username: The username for the service.
@@ -215,44 +681,71 @@ class KeyringReader:
             KeyringEntry if found, None otherwise.
         """
         try:
-            password = keyring.get_password(service, username)
+            password = self._password_cache.get((service, username))
+            if password is None:
+                password = self._keyring.get_password(service, username)
+                # Only passwords are remembered, so a credential stored after a
+                # failed lookup is found on the next one
+                if password:
+                    if len(self._password_cache) >= _PASSWORD_CACHE_SIZE:
+                        self._password_cache.clear()
+                    self._password_cache[(service, username)] = password
             if password:
-                logger.debug(f"Retrieved credential for {service}/{username}")
+                logger.debug("Retrieved credential for %s/%s", service, username)
                 return KeyringEntry(
                     service=service,
                     username=username,
                     password=password,
                     attributes=None,
                 )
-            logger.debug(f"No password found for {service}/{username}")
+            logger.debug("No password found for %s/%s", service, username)
             return None
         except Exception as e:
-            logger.error(f"Failed to get credential for {service}/{username}: {e}")
+            logger.error("Failed to get credential for %s/%s: %s", service, username, e)
             return None
 
-    def test_backend(self) -> bool:
+    def clear_cache(self) -> None:
+        """Drop the passwords remembered by get_credential()."""
+        self._password_cache.clear()
+
+    def test_backend(self, deep: bool = False) -> bool:
         """
         Test if the keyring backend is working properly.
 
+        By default only the backend's priority is checked, the way keyring itself
+        decides whether a backend is usable. This needs no round trip to the
+        keyring service and never prompts the user.
+
+        Args:
+            deep: Also store, read back and delete a test credential.
+
         Returns:
             True if backend is accessible, False otherwise.
         """
+        if not deep:
+            try:
+                # Backends raise or report a priority of 0 or less when unusable
+                return self.backend.priority > 0
+            except Exception as e:
+                logger.error("Keyring backend test failed: %s", e)
+                return False
+
         test_service = "__keyring_to_kdbx_test__"
         test_username = "test_user"
         test_password = "test_password_12345"
 
         try:
             # Try to set a test credential
-            keyring.set_password(test_service, test_username, test_password)
+            self._keyring.set_password(test_service, test_username, test_password)
 
             # Try to retrieve it
-            retrieved = keyring.get_password(test_service, test_username)
+            retrieved = self._keyring.get_password(test_service, test_username)
 
             # Clean up
             with contextlib.suppress(Exception):
-                keyring.delete_password(test_service, test_username)
+                self._keyring.delete_password(test_service, test_username)
 
             return retrieved == test_password
         except Exception as e:
-            logger.error(f"Keyring backend test failed: {e}")
+            logger.error("Keyring backend test failed: %s", e)
             return False
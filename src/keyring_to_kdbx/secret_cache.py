@@ -0,0 +1,135 @@
+"""Module for remembering which keyring secrets were already exported."""
+
+import hashlib
+import json
+import logging
+import secrets
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Size of the random salt the cache key is derived with
+_SALT_SIZE = 16
+
+# scrypt cost parameters, so guessing master passwords against a stolen cache
+# file is slow, like it is against the database itself
+_SCRYPT_PARAMS = {"n": 2**14, "r": 8, "p": 1}
+
+
+class SecretCache:
+    """
+    Records the modification time and a keyed digest of every exported secret.
+
+    On the next run, an item whose modification time has not changed and whose
+    digest matches the password already stored in the KDBX database does not
+    need its secret decrypted again. No secret is stored in the cache, and no
+    service or username either: digests are keyed with a key derived from the
+    database master password with scrypt and a salt stored in the cache file, so
+    they are useless without the password and slow to test guesses of it against.
+    """
+
+    def __init__(self, cache_path: Path, master_password: str) -> None:
+        """
+        Initialise the cache, loading any previous state from disk.
+
+        Args:
+            cache_path: Path to the JSON cache file.
+            master_password: Master password of the KDBX database the cache belongs to.
+        """
+        self.cache_path = cache_path
+        self._salt, self._records = self._load()
+        self._key = hashlib.scrypt(
+            master_password.encode("utf-8"), salt=self._salt, dklen=32, **_SCRYPT_PARAMS
+        )
+
+    def _load(self) -> tuple[bytes, dict[str, list]]:
+        """
+        Read the cache file.
+
+        Returns:
+            The salt and the cached records. A new salt and no records if the file
+            is missing, unreadable or not in the expected format.
+        """
+        try:
+            with self.cache_path.open(encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable secret cache %s: %s", self.cache_path, e)
+            state = None
+
+        if isinstance(state, dict) and isinstance(state.get("records"), dict):
+            try:
+                salt = bytes.fromhex(state.get("salt"))
+            except (TypeError, ValueError):
+                salt = b""
+            if len(salt) == _SALT_SIZE:
+                return salt, state["records"]
+
+        return secrets.token_bytes(_SALT_SIZE), {}
+
+    def _digest(self, value: str) -> str:
+        """Return the keyed digest of a password or record name."""
+        return hashlib.blake2b(value.encode("utf-8"), key=self._key).hexdigest()
+
+    def _key_for(self, service: str, username: str) -> str:
+        """Return the record key of a credential, which doesn't reveal it."""
+        return self._digest(f"\0{service}\0{username}")
+
+    def is_current(
+        self, service: str, username: str, modified: float, stored_password: str | None
+    ) -> bool:
+        """
+        Check whether a keyring item is unchanged since it was last exported.
+
+        Args:
+            service: Service of the keyring item.
+            username: Username of the keyring item.
+            modified: Modification time reported by the keyring for the item.
+            stored_password: Password of the matching KDBX entry.
+
+        Returns:
+            True if the item was not modified and its secret is the stored password.
+        """
+        record = self._records.get(self._key_for(service, username))
+        # Records that aren't a [modified, digest] pair are treated as missing
+        if stored_password is None or not (isinstance(record, list) and len(record) == 2):
+            return False
+
+        cached_modified, digest = record
+        return cached_modified == modified and digest == self._digest(stored_password)
+
+    def record(self, service: str, username: str, modified: float, password: str) -> None:
+        """
+        Remember an exported secret.
+
+        Args:
+            service: Service of the keyring item.
+            username: Username of the keyring item.
+            modified: Modification time reported by the keyring for the item.
+            password: The exported secret.
+        """
+        self._records[self._key_for(service, username)] = [modified, self._digest(password)]
+
+    def save(self) -> None:
+        """Write the cache to a temporary file and move it over the cache path."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.cache_path.parent,
+            prefix=f".{self.cache_path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+            try:
+                json.dump({"salt": self._salt.hex(), "records": self._records}, tmp)
+            except BaseException:
+                tmp.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+        tmp_path.replace(self.cache_path)
@@ -0,0 +1,10 @@
+"""Shared fixtures for the test suite."""
+
+import pytest
+from pykeepass.exceptions import CredentialsError
+
+
+@pytest.fixture(scope="session")
+def credentials_error_cls():
+    """Provide the exception pykeepass raises for wrong credentials."""
+    return CredentialsError
@@ -10,7 +10,9 @@ from keyring_to_kdbx.exporter import (
     GroupStrategy,
     KeyringExporter,
 )
+from keyring_to_kdbx.kdbx_manager import KdbxManager
 from keyring_to_kdbx.keyring_reader import KeyringEntry
+from keyring_to_kdbx.secret_cache import SecretCache
 
 
 @pytest.fixture
@@ -25,6 +27,19 @@ def test_password():
     return "export_password_123"
 
 
+def make_mock_manager():
+    """Build a mock KdbxManager whose batch writes succeed for every entry."""
+    manager = Mock()
+    manager.add_entries.side_effect = lambda batch, on_error=None: [Mock() for _ in batch]
+    manager.update_entries.side_effect = lambda updates, on_error=None: [e for e, _ in updates]
+    return manager
+
+
+def added_entries(mock_manager):
+    """Return the entry specifications passed to add_entries across all batches."""
+    return [spec for call in mock_manager.add_entries.call_args_list for spec in call.args[0]]
+
+
 @pytest.fixture
 def sample_keyring_entries():
     """Provide sample keyring entries for testing."""
@@ -127,7 +142,7 @@ class TestKeyringExporterExport:
     ):
         """Test export with no credentials returns empty result."""
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = []
+        mock_reader.iter_all_credentials.return_value = []
         mock_reader_class.return_value = mock_reader
 
         exporter = KeyringExporter(temp_output_path, test_password)
@@ -137,6 +152,28 @@ class TestKeyringExporterExport:
         assert result.added == 0
         mock_manager_class.assert_not_called()
 
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_export_releases_master_password(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+    ):
+        """Test that secrets are dropped after export and the password can't be reused."""
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = []
+        mock_reader_class.return_value = mock_reader
+
+        exporter = KeyringExporter(temp_output_path, test_password)
+        exporter.export()
+
+        assert exporter.password is None
+        mock_reader.clear_cache.assert_called_once()
+        with pytest.raises(RuntimeError, match="already released"):
+            exporter.export()
+
     @patch("keyring_to_kdbx.exporter.KdbxManager")
     @patch("keyring_to_kdbx.exporter.KeyringReader")
     def test_export_creates_new_database(
@@ -149,20 +186,23 @@ class TestKeyringExporterExport:
     ):
         """Test export creates new database when file doesn't exist."""
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = sample_keyring_entries
+        mock_reader.iter_all_credentials.return_value = sample_keyring_entries
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None  # No existing entries
         mock_manager_class.return_value = mock_manager
 
         exporter = KeyringExporter(temp_output_path, test_password)
         result = exporter.export()
 
-        mock_manager_class.assert_called_once_with(temp_output_path, test_password, create=True)
+        mock_manager_class.assert_called_once_with(
+            temp_output_path, test_password, create=True, kdf_params=None
+        )
         assert result.total == 3
         assert result.added == 3
-        assert mock_manager.add_entry.call_count == 3
+        assert len(added_entries(mock_manager)) == 3
+        mock_manager.add_entry.assert_not_called()
         mock_manager.save.assert_called_once()
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
@@ -180,17 +220,19 @@ class TestKeyringExporterExport:
         temp_output_path.touch()
 
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = sample_keyring_entries
+        mock_reader.iter_all_credentials.return_value = sample_keyring_entries
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
         exporter = KeyringExporter(temp_output_path, test_password)
         result = exporter.export()
 
-        mock_manager_class.assert_called_once_with(temp_output_path, test_password, create=False)
+        mock_manager_class.assert_called_once_with(
+            temp_output_path, test_password, create=False, kdf_params=None
+        )
         assert result.total == 3
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
@@ -205,17 +247,18 @@ class TestKeyringExporterExport:
     ):
         """Test export handles errors for individual entries."""
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = sample_keyring_entries
+        mock_reader.iter_all_credentials.return_value = sample_keyring_entries
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
+
         # First add succeeds, second fails, third succeeds
-        mock_manager.add_entry.side_effect = [
-            Mock(),
-            Exception("Add failed"),
-            Mock(),
-        ]
+        def add_entries(batch, on_error=None):
+            on_error(batch[1], Exception("Add failed"))
+            return [Mock(), Mock()]
+
+        mock_manager.add_entries.side_effect = add_entries
         mock_manager_class.return_value = mock_manager
 
         exporter = KeyringExporter(temp_output_path, test_password)
@@ -241,10 +284,10 @@ class TestConflictResolution:
         """Test skip conflict resolution."""
         entry = KeyringEntry("service", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_existing_entry = Mock()
         mock_manager.find_entry.return_value = mock_existing_entry
         mock_manager_class.return_value = mock_manager
@@ -258,8 +301,8 @@ class TestConflictResolution:
 
         assert result.skipped == 1
         assert result.added == 0
-        mock_manager.add_entry.assert_not_called()
-        mock_manager.update_entry.assert_not_called()
+        mock_manager.add_entries.assert_not_called()
+        mock_manager.update_entries.assert_not_called()
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
     @patch("keyring_to_kdbx.exporter.KeyringReader")
@@ -273,10 +316,10 @@ class TestConflictResolution:
         """Test overwrite conflict resolution."""
         entry = KeyringEntry("service", "user", "new_password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_existing_entry = Mock()
         mock_manager.find_entry.return_value = mock_existing_entry
         mock_manager_class.return_value = mock_manager
@@ -290,8 +333,121 @@ class TestConflictResolution:
 
         assert result.updated == 1
         assert result.added == 0
-        mock_manager.update_entry.assert_called_once()
-        mock_manager.add_entry.assert_not_called()
+        mock_manager.update_entries.assert_called_once()
+        existing, fields = mock_manager.update_entries.call_args.args[0][0]
+        assert existing is mock_existing_entry
+        assert fields["password"] == "new_password"
+        mock_manager.add_entries.assert_not_called()
+
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_conflict_resolution_overwrite_skips_unchanged_entry(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+    ):
+        """Test that overwrite leaves an entry alone when nothing would change."""
+        entry = KeyringEntry("service", "user", "same_password")
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [entry]
+        mock_reader_class.return_value = mock_reader
+
+        mock_manager = make_mock_manager()
+        mock_manager.find_entry.return_value = Mock(
+            password="same_password", notes="Exported from system keyring (updated)"
+        )
+        mock_manager_class.return_value = mock_manager
+
+        exporter = KeyringExporter(
+            temp_output_path,
+            test_password,
+            conflict_resolution=ConflictResolution.OVERWRITE,
+        )
+        result = exporter.export()
+
+        assert result.skipped == 1
+        assert result.updated == 0
+        mock_manager.update_entries.assert_not_called()
+
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_secret_cache_skips_unchanged_entries(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+        tmp_path,
+    ):
+        """Test that items unchanged since the last export are not read again."""
+        cache_path = tmp_path / "secrets.json"
+        cache = SecretCache(cache_path, test_password)
+        cache.record("service", "user", 1.0, "password")
+        cache.save()
+
+        items = [("service", "user", 1.0, "password"), ("other", "user", 2.0, "other_password")]
+
+        def read(is_unchanged):
+            return [
+                KeyringEntry(service, username, password, modified=modified)
+                for service, username, modified, password in items
+                if not is_unchanged(service, username, modified)
+            ]
+
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.side_effect = read
+        mock_reader_class.return_value = mock_reader
+
+        mock_manager = make_mock_manager()
+        mock_manager.find_entry.side_effect = lambda service, username, group_name: (
+            Mock(password="password") if service == "service" else None
+        )
+        mock_manager_class.return_value = mock_manager
+
+        exporter = KeyringExporter(temp_output_path, test_password, cache_path=cache_path)
+        result = exporter.export()
+
+        assert result.total == 2
+        assert result.skipped == 1
+        assert result.added == 1
+        assert [spec["service"] for spec in added_entries(mock_manager)] == ["other"]
+
+        # The newly exported item is remembered for the next run
+        cache = SecretCache(cache_path, test_password)
+        assert cache.is_current("other", "user", 2.0, "other_password")
+
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_secret_cache_reads_every_item_when_renaming(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+        tmp_path,
+    ):
+        """Test that no unchanged check is made when every item is added as a copy."""
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [
+            KeyringEntry("service", "user", "password", modified=1.0)
+        ]
+        mock_reader_class.return_value = mock_reader
+        mock_manager = make_mock_manager()
+        mock_manager.find_entry.return_value = None
+        mock_manager_class.return_value = mock_manager
+
+        exporter = KeyringExporter(
+            temp_output_path,
+            test_password,
+            conflict_resolution=ConflictResolution.RENAME,
+            cache_path=tmp_path / "secrets.json",
+        )
+        result = exporter.export()
+
+        mock_reader.iter_all_credentials.assert_called_once_with(None)
+        assert result.added == 1
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
     @patch("keyring_to_kdbx.exporter.KeyringReader")
@@ -305,10 +461,10 @@ class TestConflictResolution:
         """Test rename conflict resolution."""
         entry = KeyringEntry("service", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_existing_entry = Mock()
         mock_manager.find_entry.return_value = mock_existing_entry
         mock_manager_class.return_value = mock_manager
@@ -322,11 +478,111 @@ class TestConflictResolution:
 
         assert result.added == 1
         assert result.updated == 0
-        mock_manager.add_entry.assert_called_once()
+        assert len(added_entries(mock_manager)) == 1
         # Check that service name was modified
-        call_kwargs = mock_manager.add_entry.call_args.kwargs
+        call_kwargs = added_entries(mock_manager)[0]
         assert "keyring" in call_kwargs["service"].lower()
 
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_duplicate_keyring_entries_conflict_with_each_other(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+    ):
+        """Test that a repeated keyring entry conflicts with its queued first copy."""
+        entry = KeyringEntry("service", "user", "password")
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [entry, entry]
+        mock_reader_class.return_value = mock_reader
+
+        # The first copy is only found once it has been written
+        mock_manager = make_mock_manager()
+        mock_manager.find_entry.side_effect = [None, Mock()]
+        mock_manager_class.return_value = mock_manager
+
+        exporter = KeyringExporter(
+            temp_output_path,
+            test_password,
+            conflict_resolution=ConflictResolution.SKIP,
+        )
+        result = exporter.export()
+
+        assert result.added == 1
+        assert result.skipped == 1
+        assert len(added_entries(mock_manager)) == 1
+
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_overwrite_keeps_last_keyring_item_for_same_entry(
+        self, mock_reader_class, temp_output_path, test_password
+    ):
+        """Test that the last of several items for one entry wins, whatever was stored."""
+        notes = "Exported from system keyring (updated)"
+        mgr = KdbxManager(temp_output_path, test_password, create=True)
+        mgr.add_entry(service="service", username="user", password="password2", notes=notes)
+        mgr.save()
+        mgr.close()
+
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [
+            KeyringEntry("service", "user", "password1"),
+            KeyringEntry("service", "user", "password2"),
+        ]
+        mock_reader_class.return_value = mock_reader
+
+        exporter = KeyringExporter(
+            temp_output_path,
+            test_password,
+            conflict_resolution=ConflictResolution.OVERWRITE,
+            group_strategy=GroupStrategy.FLAT,
+            create_backup=False,
+        )
+        result = exporter.export()
+
+        assert result.updated == 2
+        assert result.skipped == 0
+        entry = KdbxManager(temp_output_path, test_password).find_entry("service", "user")
+        assert entry.password == "password2"
+
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_entries_with_same_sanitised_title_conflict_with_each_other(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+    ):
+        """Test that services only differing by removed characters are one entry."""
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [
+            KeyringEntry('my"service', "user", "password1"),
+            KeyringEntry("myservice", "user", "password2"),
+        ]
+        mock_reader_class.return_value = mock_reader
+
+        # Like the manager, only find the first entry once it has been written
+        mock_manager = make_mock_manager()
+        mock_manager.find_entry.side_effect = lambda *_args: (
+            Mock() if mock_manager.add_entries.called else None
+        )
+        mock_manager_class.return_value = mock_manager
+
+        exporter = KeyringExporter(
+            temp_output_path,
+            test_password,
+            conflict_resolution=ConflictResolution.SKIP,
+            group_strategy=GroupStrategy.FLAT,
+        )
+        result = exporter.export()
+
+        assert result.added == 1
+        assert result.skipped == 1
+        assert result.errors == 0
+        assert [spec["password"] for spec in added_entries(mock_manager)] == ["password1"]
+
 
 class TestGroupStrategies:
     """Tests for group organisation strategies."""
@@ -343,10 +599,10 @@ class TestGroupStrategies:
         """Test flat group strategy (no groups)."""
         entry = KeyringEntry("service", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
@@ -358,7 +614,7 @@ class TestGroupStrategies:
         result = exporter.export()
 
         assert result.added == 1
-        call_kwargs = mock_manager.add_entry.call_args.kwargs
+        call_kwargs = added_entries(mock_manager)[0]
         assert call_kwargs["group_name"] is None
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
@@ -373,10 +629,10 @@ class TestGroupStrategies:
         """Test service group strategy."""
         entry = KeyringEntry("myservice", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
@@ -388,7 +644,7 @@ class TestGroupStrategies:
         result = exporter.export()
 
         assert result.added == 1
-        call_kwargs = mock_manager.add_entry.call_args.kwargs
+        call_kwargs = added_entries(mock_manager)[0]
         assert call_kwargs["group_name"] == "myservice"
 
     @patch("keyring_to_kdbx.exporter.KdbxManager")
@@ -403,10 +659,10 @@ class TestGroupStrategies:
         """Test domain group strategy."""
         entry = KeyringEntry("https://www.example.com/path", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
@@ -418,7 +674,7 @@ class TestGroupStrategies:
         result = exporter.export()
 
         assert result.added == 1
-        call_kwargs = mock_manager.add_entry.call_args.kwargs
+        call_kwargs = added_entries(mock_manager)[0]
         assert call_kwargs["group_name"] == "example.com"
 
 
@@ -440,10 +696,10 @@ class TestBackupFunctionality:
 
         entry = KeyringEntry("service", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
@@ -472,10 +728,10 @@ class TestBackupFunctionality:
 
         entry = KeyringEntry("service", "user", "password")
         mock_reader = Mock()
-        mock_reader.get_all_credentials.return_value = [entry]
+        mock_reader.iter_all_credentials.return_value = [entry]
         mock_reader_class.return_value = mock_reader
 
-        mock_manager = Mock()
+        mock_manager = make_mock_manager()
         mock_manager.find_entry.return_value = None
         mock_manager_class.return_value = mock_manager
 
@@ -487,3 +743,32 @@ class TestBackupFunctionality:
         assert backup2.exists()
         assert backup2.read_text() == "content1"
         assert backup1.read_text() == "backup1"  # Original backup unchanged
+
+    @patch("keyring_to_kdbx.exporter.KdbxManager")
+    @patch("keyring_to_kdbx.exporter.KeyringReader")
+    def test_backup_numbering_continues_after_highest(
+        self,
+        mock_reader_class,
+        mock_manager_class,
+        temp_output_path,
+        test_password,
+    ):
+        """Test that a new backup is numbered after the highest existing one."""
+        temp_output_path.write_text("content")
+        backup = temp_output_path.with_suffix(temp_output_path.suffix + ".backup")
+        backup.write_text("backup")
+        backup3 = temp_output_path.with_suffix(temp_output_path.suffix + ".backup3")
+        backup3.write_text("backup3")
+
+        mock_reader = Mock()
+        mock_reader.iter_all_credentials.return_value = [KeyringEntry("service", "user", "pw")]
+        mock_reader_class.return_value = mock_reader
+        mock_manager_class.return_value = make_mock_manager()
+
+        exporter = KeyringExporter(temp_output_path, test_password, create_backup=True)
+        exporter.export()
+
+        backup4 = temp_output_path.with_suffix(temp_output_path.suffix + ".backup4")
+        assert backup4.read_text() == "content"
+        assert backup3.read_text() == "backup3"
+        assert not temp_output_path.with_suffix(temp_output_path.suffix + ".backup1").exists()
@@ -1,13 +1,32 @@
 """Tests for kdbx_manager module."""
 
+from datetime import datetime, timezone
 from pathlib import Path
-from unittest.mock import Mock, patch
+from types import SimpleNamespace
+from unittest.mock import Mock
+from uuid import uuid4
 
 import pytest
-from pykeepass.exceptions import CredentialsError
+from lxml import etree
+from pykeepass.pykeepass import BLANK_DATABASE_LOCATION, BLANK_DATABASE_PASSWORD
 
+from keyring_to_kdbx import kdbx_manager
 from keyring_to_kdbx.kdbx_manager import KdbxManager
 
+# Attributes of pykeepass entries and groups used by KdbxManager. Specced mocks
+# reject anything else instead of growing a child mock for every access.
+_ENTRY_SPEC = ["title", "username", "password", "notes", "url", "_element"]
+_GROUP_SPEC = ["name", "uuid", "entries", "parentgroup"]
+
+# Shared stand-ins for tests that only count or store objects. They are never
+# configured or asserted on, so sharing them between tests is safe.
+_ENTRY_SENTINEL = Mock(spec=_ENTRY_SPEC)
+_GROUP_SENTINEL = Mock(spec=_GROUP_SPEC)
+
+# Two distinct entries with the same title and username, which lookups only read
+_FIRST_MATCH = Mock(spec=_ENTRY_SPEC, title="test_service", username="test_user")
+_SECOND_MATCH = Mock(spec=_ENTRY_SPEC, title="test_service", username="test_user")
+
 
 @pytest.fixture
 def temp_kdbx_path(tmp_path):
@@ -15,112 +34,122 @@ def temp_kdbx_path(tmp_path):
     return tmp_path / "test.kdbx"
 
 
+@pytest.fixture(scope="session")
+def fake_kdbx_dir(tmp_path_factory):
+    """Provide one directory for the database paths of tests that never write them."""
+    return tmp_path_factory.mktemp("fake")
+
+
 @pytest.fixture
+def fake_kdbx_path(fake_kdbx_dir):
+    """
+    Provide a database path for tests running against the mocked database.
+
+    The manager checks whether the file exists, so every test gets a name of its
+    own, but the directory is created once per session rather than per test.
+    """
+    return fake_kdbx_dir / f"{uuid4().hex}.kdbx"
+
+
+@pytest.fixture(scope="session")
 def test_password():
     """Provide a test password."""
     return "test_password_123"
 
 
+@pytest.fixture(scope="module")
+def uninit_manager():
+    """Provide a manager whose database was never opened."""
+    manager = KdbxManager.__new__(KdbxManager)
+    manager.kp = None
+    return manager
+
+
+@pytest.fixture(autouse=True)
+def patched_pykeepass(request, monkeypatch):
+    """
+    Replace PyKeePass with a mock returning the same database for every file.
+
+    The database has no groups to find. Tests marked real_database run against
+    pykeepass itself.
+    """
+    if request.node.get_closest_marker("real_database"):
+        return None
+
+    mock_kp = Mock()
+    mock_kp.find_groups.return_value = None
+    mock_pykeepass = Mock(return_value=mock_kp)
+    monkeypatch.setattr(kdbx_manager, "PyKeePass", mock_pykeepass)
+    return SimpleNamespace(kp=mock_kp, PyKeePass=mock_pykeepass)
+
+
+@pytest.fixture
+def manager(patched_pykeepass, fake_kdbx_path, test_password):
+    """Provide a manager over a new database; configure it through patched_pykeepass.kp."""
+    return KdbxManager(fake_kdbx_path, test_password, create=True)
+
+
 class TestKdbxManagerInit:
     """Tests for KdbxManager initialization."""
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_create_new_database_calls_pykeepass_constructor(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
-        """Test that creating new database uses create_database correctly."""
-        mock_kp = Mock()
-        mock_create_db.return_value = mock_kp
+    def test_init_creates_new_database(self, fake_kdbx_path, test_password, patched_pykeepass):
+        """Test that a new database is bound to its path and only saved on save()."""
+        manager = KdbxManager(fake_kdbx_path, test_password, create=True)
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
-
-        # Verify create_database was called with correct arguments
-        mock_create_db.assert_called_once()
-        call_args = mock_create_db.call_args
-        # Compare paths as Path objects to handle Windows/Unix differences
-        called_path = (
-            Path(call_args.args[0])
-            if call_args.args
-            else Path(call_args.kwargs.get("filename", ""))
+        # The blank database is opened and bound to the path, not saved yet
+        patched_pykeepass.PyKeePass.assert_called_once_with(
+            BLANK_DATABASE_LOCATION, BLANK_DATABASE_PASSWORD
         )
-        assert called_path == temp_kdbx_path
-        assert test_password in call_args.kwargs.values()
+        assert patched_pykeepass.kp.password == test_password
+        # Compare paths as Path objects to handle Windows/Unix differences
+        assert Path(patched_pykeepass.kp.filename) == fake_kdbx_path
+        patched_pykeepass.kp.save.assert_not_called()
+        assert not fake_kdbx_path.exists()
 
-        # Verify manager is usable
-        assert manager.kp is not None
+        # The first save writes the new database
+        manager.save()
+        patched_pykeepass.kp.save.assert_called_once()
 
-    @patch("keyring_to_kdbx.kdbx_manager.PyKeePass")
-    def test_open_existing_database_does_not_save(
-        self, mock_pykeepass, temp_kdbx_path, test_password
+    @pytest.mark.parametrize("create", [False, True], ids=["open_existing", "create_when_exists"])
+    def test_init_opens_existing_database(
+        self, temp_kdbx_path, test_password, patched_pykeepass, create
     ):
-        """Test that opening existing database doesn't auto-save."""
-        # Create a dummy file to simulate existing database
+        """Test that an existing file is opened, never recreated or saved."""
         temp_kdbx_path.touch()
 
-        mock_kp = Mock()
-        mock_pykeepass.return_value = mock_kp
-
-        manager = KdbxManager(temp_kdbx_path, test_password, create=False)
+        manager = KdbxManager(temp_kdbx_path, test_password, create=create)
 
-        # Verify it opens the file (not creates)
-        mock_pykeepass.assert_called_once_with(
+        patched_pykeepass.PyKeePass.assert_called_once_with(
             str(temp_kdbx_path), password=test_password, keyfile=None
         )
+        patched_pykeepass.kp.save.assert_not_called()
+        assert manager.kp == patched_pykeepass.kp
 
-        # Verify manager is usable
-        assert manager.kp is not None
-
-    def test_open_nonexistent_database_raises_error(self, temp_kdbx_path, test_password):
-        """Test opening a non-existent database raises FileNotFoundError."""
+    def test_init_nonexistent_database_raises_error(self, temp_kdbx_path, test_password):
+        """Test that opening a missing database without create fails."""
         with pytest.raises(FileNotFoundError):
             KdbxManager(temp_kdbx_path, test_password, create=False)
 
-    @patch("keyring_to_kdbx.kdbx_manager.PyKeePass")
-    def test_open_with_wrong_password_raises_error(
-        self, mock_pykeepass, temp_kdbx_path, test_password
+    def test_init_wrong_password_raises_error(
+        self, temp_kdbx_path, test_password, patched_pykeepass, credentials_error_cls
     ):
-        """Test opening with wrong password raises CredentialsError."""
+        """Test that a wrong master password is reported as such."""
         temp_kdbx_path.touch()
-        mock_pykeepass.side_effect = CredentialsError("Invalid credentials")
+        patched_pykeepass.PyKeePass.side_effect = credentials_error_cls("Invalid credentials")
 
-        with pytest.raises(CredentialsError, match="Incorrect password"):
+        with pytest.raises(credentials_error_cls, match="Incorrect password"):
             KdbxManager(temp_kdbx_path, test_password, create=False)
 
-    @patch("keyring_to_kdbx.kdbx_manager.PyKeePass")
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_create_when_exists_opens_instead(
-        self, mock_create_db, mock_pykeepass, temp_kdbx_path, test_password
-    ):
-        """Test that create=True on existing file opens it instead."""
-        temp_kdbx_path.touch()
-
-        mock_kp = Mock()
-        mock_pykeepass.return_value = mock_kp
-
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
-
-        assert manager.kp == mock_kp
-        # Should call PyKeePass to open, not create_database
-        mock_pykeepass.assert_called()
-        mock_create_db.assert_not_called()
-
 
 class TestKdbxManagerGroups:
     """Tests for group management."""
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_get_or_create_group_searches_first(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_get_or_create_group_searches_first(self, manager, patched_pykeepass):
         """Test that get_or_create_group searches for existing group before creating."""
-        mock_kp = Mock()
-        mock_kp.find_groups.return_value = None
-        mock_kp.root_group = Mock()
         mock_new_group = Mock()
+        mock_kp = patched_pykeepass.kp
         mock_kp.add_group.return_value = mock_new_group
-        mock_create_db.return_value = mock_kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         group = manager.get_or_create_group("TestGroup")
 
         # Verify it searches first
@@ -132,17 +161,12 @@ class TestKdbxManagerGroups:
         # Verify it returns the created group
         assert group == mock_new_group
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_get_or_create_group_avoids_duplicates(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_get_or_create_group_avoids_duplicates(self, manager, patched_pykeepass):
         """Test that existing groups are reused, not duplicated."""
-        mock_kp = Mock()
         mock_existing_group = Mock()
+        mock_kp = patched_pykeepass.kp
         mock_kp.find_groups.return_value = mock_existing_group
-        mock_create_db.return_value = mock_kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         group = manager.get_or_create_group("ExistingGroup")
 
         # Verify it searches for the group
@@ -152,30 +176,82 @@ class TestKdbxManagerGroups:
         assert group == mock_existing_group
         mock_kp.add_group.assert_not_called()
 
-    def test_get_or_create_group_without_init_raises_error(self, temp_kdbx_path, test_password):
-        """Test that calling get_or_create_group without init raises error."""
-        manager = KdbxManager.__new__(KdbxManager)
-        manager.kp = None
+    def test_get_or_create_group_caches_resolved_groups(self, manager, patched_pykeepass):
+        """Test that repeated lookups of the same group don't search the tree again."""
+        mock_new_group = Mock()
+        mock_kp = patched_pykeepass.kp
+        mock_kp.add_group.return_value = mock_new_group
+
+        first = manager.get_or_create_group("TestGroup")
+        second = manager.get_or_create_group("TestGroup")
+
+        # Verify the tree is searched and the group created only once
+        mock_kp.find_groups.assert_called_once()
+        mock_kp.add_group.assert_called_once()
+        assert first is second is mock_new_group
+
+    def test_prewarm_groups_avoids_search(self, manager, patched_pykeepass):
+        """Test that prewarmed groups are resolved without calling find_groups."""
+        mock_root = Mock()
+        mock_root.parentgroup = None
+        mock_existing_group = Mock()
+        mock_existing_group.name = "ExistingGroup"
+        mock_existing_group.parentgroup = mock_root
+        mock_kp = patched_pykeepass.kp
+        mock_kp.root_group = mock_root
+        mock_kp.groups = [mock_root, mock_existing_group]
+
+        manager.prewarm_groups()
+        group = manager.get_or_create_group("ExistingGroup")
+
+        assert group is mock_existing_group
+        mock_kp.find_groups.assert_not_called()
+        mock_kp.add_group.assert_not_called()
+
+    def test_find_entry_after_prewarm_avoids_search(self, manager, patched_pykeepass):
+        """Test that find_entry() resolves present and missing groups without find_groups."""
+        mock_root = Mock(parentgroup=None, entries=[])
+        mock_existing_group = Mock(parentgroup=mock_root, entries=[])
+        mock_existing_group.name = "ExistingGroup"
+        mock_kp = patched_pykeepass.kp
+        mock_kp.root_group = mock_root
+        mock_kp.groups = [mock_root, mock_existing_group]
+
+        manager.prewarm_groups()
+
+        assert manager.find_entry("service", "user", group_name="ExistingGroup") is None
+        assert manager.find_entry("service", "user", group_name="MissingGroup") is None
+        mock_kp.find_groups.assert_not_called()
+
+    @pytest.mark.real_database
+    def test_root_group_name_resolves_the_same_after_prewarm(self, temp_kdbx_path, test_password):
+        """Test that a group named like the root resolves to the same group either way."""
+        KdbxManager(temp_kdbx_path, test_password, create=True).save()
+
+        searched = KdbxManager(temp_kdbx_path, test_password, create=False)
+        prewarmed = KdbxManager(temp_kdbx_path, test_password, create=False)
+        prewarmed.prewarm_groups()
+        root_name = searched.kp.root_group.name
+
+        assert (
+            searched.get_or_create_group(root_name).uuid
+            == prewarmed.get_or_create_group(root_name).uuid
+        )
+        assert searched.get_group_count() == prewarmed.get_group_count()
 
+    def test_get_or_create_group_without_init_raises_error(self, uninit_manager):
+        """Test that calling get_or_create_group without init raises error."""
         with pytest.raises(RuntimeError, match="Database not initialised"):
-            manager.get_or_create_group("TestGroup")
+            uninit_manager.get_or_create_group("TestGroup")
 
 
 class TestKdbxManagerEntries:
     """Tests for entry management."""
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_uses_root_group_by_default(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_add_entry_uses_root_group_by_default(self, manager, patched_pykeepass):
         """Test that entries are added to root group when no group specified."""
-        mock_kp = Mock()
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
+        mock_kp = patched_pykeepass.kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         manager.add_entry(
             service="test_service",
             username="test_user",
@@ -196,18 +272,12 @@ class TestKdbxManagerEntries:
         assert call_kwargs["password"] == "test_pass"
         assert call_kwargs["notes"] == "test notes"
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_creates_group_if_needed(self, mock_create_db, temp_kdbx_path, test_password):
+    def test_add_entry_creates_group_if_needed(self, manager, patched_pykeepass):
         """Test that specifying group_name triggers group creation/retrieval."""
-        mock_kp = Mock()
         mock_group = Mock()
+        mock_kp = patched_pykeepass.kp
         mock_kp.find_groups.return_value = mock_group
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         manager.add_entry(
             service="test_service",
             username="test_user",
@@ -223,35 +293,76 @@ class TestKdbxManagerEntries:
         assert call_args.kwargs["destination_group"] == mock_group
         assert call_args.kwargs["destination_group"] != mock_kp.root_group
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_find_entry_returns_first_match(self, mock_create_db, temp_kdbx_path, test_password):
+    def test_find_entry_returns_first_match(self, manager, patched_pykeepass):
         """Test that find_entry returns first match when multiple exist."""
-        mock_kp = Mock()
-        mock_entry1 = Mock()
-        mock_entry2 = Mock()
-        mock_kp.find_entries.return_value = [mock_entry1, mock_entry2]
-        mock_create_db.return_value = mock_kp
+        mock_kp = patched_pykeepass.kp
+        mock_kp.groups = [Mock(entries=[_FIRST_MATCH]), Mock(entries=[_SECOND_MATCH])]
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         found_entry = manager.find_entry("test_service", "test_user")
 
-        # Verify it searches with correct criteria
-        mock_kp.find_entries.assert_called_once()
+        # Verify it uses the entry index instead of searching per lookup
+        mock_kp.find_entries.assert_not_called()
 
         # Verify it returns the first entry from results
-        assert found_entry == mock_entry1
-        assert found_entry != mock_entry2
+        assert found_entry is _FIRST_MATCH
+        assert found_entry is not _SECOND_MATCH
+
+    def test_find_entry_filters_by_group(self, manager, patched_pykeepass):
+        """Test that find_entry only matches entries in the requested group."""
+        mock_other_entry = Mock(title="test_service", username="test_user")
+        mock_group_entry = Mock(title="test_service", username="test_user")
+        mock_group = Mock(entries=[mock_group_entry])
+        mock_kp = patched_pykeepass.kp
+        mock_kp.groups = [Mock(entries=[mock_other_entry]), mock_group]
+        mock_kp.find_groups.return_value = mock_group
 
-    @patch("keyring_to_kdbx.kdbx_manager.PyKeePass")
-    def test_find_entry_returns_none_not_exception(
-        self, mock_pykeepass, temp_kdbx_path, test_password
-    ):
-        """Test that missing entries return None instead of raising exception."""
-        mock_kp = Mock()
-        mock_kp.find_entries.return_value = []
-        mock_pykeepass.return_value = mock_kp
+        assert manager.find_entry("test_service", "test_user", "TestGroup") is mock_group_entry
+        assert manager.find_entry("other_service", "test_user", "TestGroup") is None
+
+    def test_add_entry_updates_entry_index(self, manager, patched_pykeepass, monkeypatch):
+        """Test that added entries are found without rebuilding the index."""
+        mock_entry = Mock(spec=_ENTRY_SPEC)
+        monkeypatch.setattr(kdbx_manager, "Entry", Mock(return_value=mock_entry))
+        mock_kp = patched_pykeepass.kp
+        mock_kp.groups = []
+
+        assert manager.find_entry("test_service", "test_user") is None
+
+        entry = manager.add_entry(
+            service="test_service", username="test_user", password="test_pass"
+        )
 
+        assert entry is mock_entry
+        assert manager.find_entry("test_service", "test_user") is entry
+        # With the index, entries are appended without pykeepass searching for duplicates
+        mock_kp.add_entry.assert_not_called()
+        mock_kp.find_entries.assert_not_called()
+        mock_kp.root_group.append.assert_called_once_with(entry)
+        with pytest.raises(RuntimeError, match="already exists"):
+            manager.add_entry(service="test_service", username="test_user", password="other")
+
+    @pytest.mark.real_database
+    def test_indexed_adds_do_not_search_database(self, temp_kdbx_path, test_password, monkeypatch):
+        """Test that adds after the index is built skip pykeepass' duplicate search."""
         manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        manager.find_entry("service0", "user")
+        find_entries = Mock(wraps=manager.kp.find_entries)
+        monkeypatch.setattr(manager.kp, "find_entries", find_entries)
+
+        for i in range(5):
+            manager.add_entry(
+                service=f"service{i}", username="user", password=f"pass{i}", notes="notes"
+            )
+        manager.save()
+
+        find_entries.assert_not_called()
+        reopened = KdbxManager(temp_kdbx_path, test_password, create=False)
+        entry = reopened.find_entry("service3", "user")
+        assert (entry.password, entry.notes) == ("pass3", "notes")
+
+    def test_find_entry_returns_none_not_exception(self, manager, patched_pykeepass):
+        """Test that missing entries return None instead of raising exception."""
+        patched_pykeepass.kp.groups = []
 
         # Should not raise exception
         found_entry = manager.find_entry("nonexistent", "user")
@@ -259,16 +370,11 @@ class TestKdbxManagerEntries:
         # Should return None for not found
         assert found_entry is None
 
-    @patch("keyring_to_kdbx.kdbx_manager.PyKeePass")
-    def test_update_entry_modifies_fields(self, mock_pykeepass, temp_kdbx_path, test_password):
+    def test_update_entry_modifies_fields(self, manager):
         """Test that update_entry actually modifies the entry object."""
-        mock_kp = Mock()
-        mock_entry = Mock()
+        mock_entry = Mock(spec=_ENTRY_SPEC)
         mock_entry.password = "old_password"
         mock_entry.notes = "old_notes"
-        mock_pykeepass.return_value = mock_kp
-
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
 
         # Update specific fields
         manager.update_entry(mock_entry, password="new_password", notes="new_notes")
@@ -281,26 +387,63 @@ class TestKdbxManagerEntries:
         assert mock_entry.password != "old_password"
         assert mock_entry.notes != "old_notes"
 
-    def test_add_entry_without_init_raises_error(self, temp_kdbx_path, test_password):
-        """Test that calling add_entry without init raises error."""
-        manager = KdbxManager.__new__(KdbxManager)
-        manager.kp = None
+    def test_update_entry_without_changes_skips_save(
+        self, temp_kdbx_path, test_password, patched_pykeepass
+    ):
+        """Test that updating an entry to its current values doesn't mark the database dirty."""
+        temp_kdbx_path.touch()
+        mock_kp = patched_pykeepass.kp
+        mock_entry = Mock(
+            spec=_ENTRY_SPEC, password="password", notes="notes", url="https://example.com"
+        )
+
+        manager = KdbxManager(temp_kdbx_path, test_password, create=False)
+        manager.update_entry(mock_entry, password="password", notes="notes")
+        manager.save()
+
+        mock_kp.save.assert_not_called()
+
+    def test_add_entries_resolves_each_group_once(self, manager, patched_pykeepass):
+        """Test that a batch resolves each distinct group only once."""
+        mock_group = Mock()
+        mock_kp = patched_pykeepass.kp
+        mock_kp.find_groups.return_value = mock_group
+
+        entries = manager.add_entries(
+            [
+                {"service": "s1", "username": "u1", "password": "p1", "group_name": "G"},
+                {"service": "s2", "username": "u2", "password": "p2", "group_name": "G"},
+                {"service": "s3", "username": "u3", "password": "p3"},
+            ]
+        )
+
+        assert len(entries) == 3
+        mock_kp.find_groups.assert_called_once()
+        destinations = [c.kwargs["destination_group"] for c in mock_kp.add_entry.call_args_list]
+        assert destinations == [mock_group, mock_group, mock_kp.root_group]
 
+    def test_add_entries_reports_failures_to_callback(self, manager, patched_pykeepass):
+        """Test that a failing entry is reported and the rest of the batch is still added."""
+        mock_kp = patched_pykeepass.kp
+        error = Exception("Add failed")
+        mock_kp.add_entry.side_effect = [_ENTRY_SENTINEL, error, _ENTRY_SENTINEL]
+        on_error = Mock()
+
+        batch = [{"service": f"s{i}", "username": "user", "password": "pass"} for i in range(3)]
+        entries = manager.add_entries(batch, on_error=on_error)
+
+        assert len(entries) == 2
+        on_error.assert_called_once_with(batch[1], error)
+
+    def test_add_entry_without_init_raises_error(self, uninit_manager):
+        """Test that calling add_entry without init raises error."""
         with pytest.raises(RuntimeError, match="Database not initialised"):
-            manager.add_entry("service", "user", "pass")
+            uninit_manager.add_entry("service", "user", "pass")
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_sanitizes_special_characters(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_add_entry_sanitizes_special_characters(self, manager, patched_pykeepass):
         """Test that special characters like quotes are sanitized in title but not username."""
-        mock_kp = Mock()
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
+        mock_kp = patched_pykeepass.kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         manager.add_entry(
             service='"quoted-service"',
             username='user"with"quotes',
@@ -319,70 +462,120 @@ class TestKdbxManagerEntries:
 class TestKdbxManagerPersistence:
     """Tests for database persistence."""
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_save_can_be_called_multiple_times(self, mock_create_db, temp_kdbx_path, test_password):
-        """Test that save() can be called multiple times without error."""
-        mock_kp = Mock()
-        mock_create_db.return_value = mock_kp
+    def test_save_can_be_called_multiple_times(
+        self, temp_kdbx_path, test_password, patched_pykeepass
+    ):
+        """Test that save() can be called multiple times but only writes pending changes."""
+        mock_kp = patched_pykeepass.kp
 
         manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        manager.add_entry(service="test_service", username="test_user", password="test_pass")
 
         # Call save multiple times
         manager.save()
         manager.save()
         manager.save()
 
-        # Verify all saves went through
-        assert mock_kp.save.call_count == 3
+        # Verify only the first save wrote the database
+        assert mock_kp.save.call_count == 1
 
-    def test_save_without_init_raises_error(self, temp_kdbx_path, test_password):
-        """Test that calling save without init raises error."""
-        manager = KdbxManager.__new__(KdbxManager)
-        manager.kp = None
+    def test_save_skipped_without_changes(self, temp_kdbx_path, test_password, patched_pykeepass):
+        """Test that save() doesn't rewrite an existing database that wasn't modified."""
+        temp_kdbx_path.touch()
+        mock_kp = patched_pykeepass.kp
 
-        with pytest.raises(RuntimeError, match="Database not initialised"):
-            manager.save()
+        manager = KdbxManager(temp_kdbx_path, test_password, create=False)
+        manager.save()
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_get_entry_count_reflects_database_state(
-        self, mock_create_db, temp_kdbx_path, test_password
+        mock_kp.save.assert_not_called()
+
+    def test_save_replaces_database_atomically(
+        self, temp_kdbx_path, test_password, patched_pykeepass
     ):
-        """Test that entry count accurately reflects database entries."""
-        mock_kp = Mock()
-        mock_kp.entries = [Mock(), Mock(), Mock()]
-        mock_create_db.return_value = mock_kp
+        """Test that save() writes through a temporary file that replaces the database."""
+        mock_kp = patched_pykeepass.kp
+        mock_kp.save.side_effect = lambda stream: stream.write(b"new database")
+        temp_kdbx_path.parent.mkdir(parents=True, exist_ok=True)
 
         manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        manager.add_entry(service="test_service", username="test_user", password="test_pass")
+        manager.save()
+
+        assert temp_kdbx_path.read_bytes() == b"new database"
+        # No temporary files are left behind
+        assert list(temp_kdbx_path.parent.iterdir()) == [temp_kdbx_path]
+
+    def test_save_without_init_raises_error(self, uninit_manager):
+        """Test that calling save without init raises error."""
+        with pytest.raises(RuntimeError, match="Database not initialised"):
+            uninit_manager.save()
+
+    def test_get_entry_count_reflects_database_state(self, manager, patched_pykeepass):
+        """Test that entry count accurately reflects database entries."""
+        mock_kp = patched_pykeepass.kp
+        mock_kp.entries = [_ENTRY_SENTINEL] * 3
+
         count = manager.get_entry_count()
 
         # Verify count matches actual entries
         assert count == len(mock_kp.entries)
         assert count == 3
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_get_group_count_reflects_database_state(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_get_group_count_reflects_database_state(self, manager, patched_pykeepass):
         """Test that group count accurately reflects database groups."""
-        mock_kp = Mock()
-        mock_kp.groups = [Mock(), Mock()]
-        mock_create_db.return_value = mock_kp
+        mock_kp = patched_pykeepass.kp
+        mock_kp.groups = [_GROUP_SENTINEL] * 2
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
         count = manager.get_group_count()
 
         # Verify count matches actual groups
         assert count == len(mock_kp.groups)
         assert count == 2
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_close_database_clears_reference(self, mock_create_db, temp_kdbx_path, test_password):
-        """Test that closing database clears internal reference."""
-        mock_kp = Mock()
-        mock_create_db.return_value = mock_kp
-
+    @pytest.mark.real_database
+    def test_counts_follow_added_entries_and_groups(self, temp_kdbx_path, test_password):
+        """Test that counts stay in sync with the database as entries and groups are added."""
         manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        initial_entries = manager.get_entry_count()
+        initial_groups = manager.get_group_count()
+
+        manager.add_entry(service="service1", username="user", password="pass", group_name="g1")
+        manager.add_entry(service="service2", username="user", password="pass", group_name="g1")
+        manager.add_entry(service="service3", username="user", password="pass", group_name="g2")
+
+        assert manager.get_entry_count() == initial_entries + 3
+        assert manager.get_group_count() == initial_groups + 2
+        assert manager.get_entry_count() == len(manager.kp.entries)
+        assert manager.get_group_count() == len(manager.kp.groups)
+
+    @pytest.mark.real_database
+    def test_kdf_params_are_saved_with_database(self, temp_kdbx_path, test_password):
+        """Test that custom KDF parameters are written and the database still opens."""
+        manager = KdbxManager(
+            temp_kdbx_path,
+            test_password,
+            create=True,
+            kdf_params={"iterations": 2, "memory": 8192, "parallelism": 1},
+        )
+        manager.add_entry(service="service", username="user", password="pass")
+        manager.save()
+        manager.close()
 
+        reopened = KdbxManager(temp_kdbx_path, test_password, create=False)
+        header = reopened.kp.kdbx.header.value.dynamic_header.kdf_parameters.data.dict
+        assert header["I"].value == 2
+        assert header["M"].value == 8192 * 1024
+        assert header["P"].value == 1
+        assert reopened.find_entry("service", "user") is not None
+
+    @pytest.mark.real_database
+    def test_kdf_params_rejects_unknown_parameter(self, temp_kdbx_path, test_password):
+        """Test that parameters the database's KDF doesn't have are rejected."""
+        with pytest.raises(ValueError, match="Unsupported argon2 KDF parameters: rounds"):
+            KdbxManager(temp_kdbx_path, test_password, create=True, kdf_params={"rounds": 2})
+
+    def test_close_database_clears_reference(self, manager):
+        """Test that closing database clears internal reference."""
         # Verify database is open
         assert manager.kp is not None
 
@@ -391,16 +584,23 @@ class TestKdbxManagerPersistence:
         # Verify database reference is cleared
         assert manager.kp is None
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_close_can_be_called_multiple_times(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
-        """Test that close() is idempotent and doesn't error on repeated calls."""
-        mock_kp = Mock()
-        mock_create_db.return_value = mock_kp
-
+    @pytest.mark.real_database
+    def test_close_releases_master_password(self, temp_kdbx_path, test_password):
+        """Test that the master password isn't kept by the manager or the closed database."""
         manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        kp = manager.kp
+        credchange_date = kp.credchange_date = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+        assert test_password not in vars(manager).values()
+
+        manager.close()
 
+        assert kp.password is None
+        # Dropping the password is not a change of the database credentials
+        assert kp.credchange_date == credchange_date
+
+    def test_close_can_be_called_multiple_times(self, manager):
+        """Test that close() is idempotent and doesn't error on repeated calls."""
         # Close multiple times should not raise error
         manager.close()
         manager.close()
@@ -413,19 +613,12 @@ class TestKdbxManagerPersistence:
 class TestSecretServiceIntegration:
     """Tests for Secret Service / KeePassXC integration attributes."""
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_preserves_original_attributes(
-        self, mock_create_db, temp_kdbx_path, test_password
-    ):
+    def test_add_entry_preserves_original_attributes(self, manager, patched_pykeepass):
         """Test that original keyring attributes are preserved as custom properties."""
-        mock_kp = Mock()
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_entry.set_custom_property = Mock()
+        mock_entry = Mock(spec=_ENTRY_SPEC)
+        mock_entry._element = etree.Element("Entry")
+        mock_kp = patched_pykeepass.kp
         mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
-
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
 
         # Add entry with original attributes from keyring
         original_attrs = {
@@ -442,24 +635,35 @@ class TestSecretServiceIntegration:
         )
 
         # Verify all original attributes were preserved
-        assert mock_entry.set_custom_property.call_count == 3
+        strings = mock_entry._element.findall("String")
+        assert len(strings) == 3
 
         # Check that all original attributes were set
-        calls = mock_entry.set_custom_property.call_args_list
-        set_attrs = {call[0][0]: call[0][1] for call in calls}
+        set_attrs = {s.findtext("Key"): s.findtext("Value") for s in strings}
         assert set_attrs == original_attrs
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_without_attributes(self, mock_create_db, temp_kdbx_path, test_password):
-        """Test that entries without attributes don't cause errors."""
-        mock_kp = Mock()
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_entry.set_custom_property = Mock()
+    def test_add_entry_rejects_reserved_attribute_names(self, manager, patched_pykeepass):
+        """Test that attributes named like standard fields don't overwrite them."""
+        mock_entry = Mock(spec=_ENTRY_SPEC)
+        mock_entry._element = etree.Element("Entry")
+        mock_kp = patched_pykeepass.kp
         mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
 
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
+        with pytest.raises(ValueError, match="Password is a reserved key"):
+            manager.add_entry(
+                service="github.com",
+                username="testuser",
+                password="testpass",
+                attributes={"service": "github.com", "Password": "other"},
+            )
+        assert mock_entry._element.findall("String") == []
+
+    def test_add_entry_without_attributes(self, manager, patched_pykeepass):
+        """Test that entries without attributes don't cause errors."""
+        mock_entry = Mock(spec=_ENTRY_SPEC)
+        mock_entry._element = etree.Element("Entry")
+        mock_kp = patched_pykeepass.kp
+        mock_kp.add_entry.return_value = mock_entry
 
         # Add entry without attributes
         manager.add_entry(
@@ -470,19 +674,14 @@ class TestSecretServiceIntegration:
         )
 
         # Verify no custom properties were set
-        mock_entry.set_custom_property.assert_not_called()
+        assert mock_entry._element.findall("String") == []
 
-    @patch("keyring_to_kdbx.kdbx_manager.create_database")
-    def test_add_entry_with_empty_attributes(self, mock_create_db, temp_kdbx_path, test_password):
+    def test_add_entry_with_empty_attributes(self, manager, patched_pykeepass):
         """Test that empty attributes dict doesn't set properties."""
-        mock_kp = Mock()
-        mock_kp.root_group = Mock()
-        mock_entry = Mock()
-        mock_entry.set_custom_property = Mock()
+        mock_entry = Mock(spec=_ENTRY_SPEC)
+        mock_entry._element = etree.Element("Entry")
+        mock_kp = patched_pykeepass.kp
         mock_kp.add_entry.return_value = mock_entry
-        mock_create_db.return_value = mock_kp
-
-        manager = KdbxManager(temp_kdbx_path, test_password, create=True)
 
         # Add entry with empty attributes
         manager.add_entry(
@@ -493,4 +692,4 @@ class TestSecretServiceIntegration:
         )
 
         # Verify no custom properties were set
-        mock_entry.set_custom_property.assert_not_called()
+        assert mock_entry._element.findall("String") == []
@@ -1,19 +1,98 @@
 """Tests for keyring_reader module."""
 
-from unittest.mock import Mock, patch
+import sys
+import threading
+from dataclasses import FrozenInstanceError, asdict, fields, replace
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest.mock import Mock
 
 import pytest
 from keyring.backends.fail import Keyring as FailKeyring
+from keyring.backends.macOS import Keyring as MacKeyring
+from keyring.backends.Windows import WinVaultKeyring
 
 from keyring_to_kdbx.keyring_reader import KeyringEntry, KeyringReader
 
-# Check if secretstorage is available (Linux only)
-try:
-    import secretstorage  # noqa: F401
+# Check if secretstorage is available (Linux only) without importing it
+HAS_SECRETSTORAGE = find_spec("secretstorage") is not None
 
-    HAS_SECRETSTORAGE = True
-except ImportError:
-    HAS_SECRETSTORAGE = False
+
+# Backend attributes the reader checks for to choose how to enumerate credentials
+_SECRET_SERVICE_SPEC = ["get_all_credentials", "collection", "get_preferred_collection"]
+
+
+def make_backend(drop=()):
+    """Build a Secret Service backend mock without the attributes named in drop."""
+    backend = Mock(spec=[name for name in _SECRET_SERVICE_SPEC if name not in drop])
+    backend.__class__.__name__ = "SecretServiceKeyring"
+    return backend
+
+
+# The fixtures below are function-scoped and patch keyring through monkeypatch,
+# so no state outlives a test and `pytest -n auto` can spread them across workers
+@pytest.fixture
+def mock_backend():
+    """Provide a Secret Service backend that lists its credentials itself."""
+    return make_backend()
+
+
+@pytest.fixture
+def mock_get_keyring(monkeypatch, mock_backend):
+    """Make keyring return mock_backend; set return_value to use another backend."""
+    get_keyring = Mock(return_value=mock_backend)
+    monkeypatch.setattr("keyring.get_keyring", get_keyring)
+    return get_keyring
+
+
+@pytest.fixture
+def reader(mock_get_keyring):
+    """Provide a reader over the backend returned by mock_get_keyring."""
+    return KeyringReader()
+
+
+@pytest.fixture
+def two_credentials():
+    """Provide two credentials as a backend lists them and as collection items."""
+    creds = []
+    items = []
+    for i in (1, 2):
+        attributes = {"service": f"service{i}", "username": f"user{i}"}
+        creds.append(
+            Mock(spec=["service", "username", "attributes"], attributes=attributes, **attributes)
+        )
+        item = Mock()
+        item.get_attributes.return_value = attributes
+        item.get_secret.return_value = f"password{i}".encode()
+        items.append(item)
+    return creds, items
+
+
+@pytest.fixture
+def mock_secretstorage(monkeypatch):
+    """Replace the secretstorage module imported by readers with a mock."""
+    secretstorage = Mock()
+    monkeypatch.setitem(sys.modules, "secretstorage", secretstorage)
+    return secretstorage
+
+
+@pytest.fixture
+def mock_get_password(monkeypatch):
+    """Replace keyring.get_password with a mock."""
+    get_password = Mock()
+    monkeypatch.setattr("keyring.get_password", get_password)
+    return get_password
+
+
+@pytest.fixture
+def mock_keyring(monkeypatch, mock_get_password):
+    """Replace the keyring functions used by the round-trip backend test."""
+    mocks = SimpleNamespace(
+        set_password=Mock(), get_password=mock_get_password, delete_password=Mock()
+    )
+    monkeypatch.setattr("keyring.set_password", mocks.set_password)
+    monkeypatch.setattr("keyring.delete_password", mocks.delete_password)
+    return mocks
 
 
 class TestKeyringEntry:
@@ -48,21 +127,43 @@ class TestKeyringEntry:
         assert "username='user'" in repr_str or 'username="user"' in repr_str
         assert "password='***'" in repr_str or 'password="***"' in repr_str
 
+    def test_keyring_entry_is_immutable_and_hashable(self):
+        """Test that entries can't be modified and can be collected in a set."""
+        entry = KeyringEntry("test.com", "user", "secret", attributes={"service": "test.com"})
+        duplicate = KeyringEntry("test.com", "user", "secret", attributes={"service": "test.com"})
+
+        with pytest.raises(FrozenInstanceError):
+            entry.password = "changed"
+
+        assert {entry, duplicate} == {entry}
+
+    def test_keyring_entry_fields_are_only_its_data(self):
+        """Test that fields(), asdict() and replace() only see the credential's data."""
+        entry = KeyringEntry("test.com", "user", "secret")
+        repr(entry)
+
+        assert [f.name for f in fields(entry)] == [
+            "service",
+            "username",
+            "password",
+            "attributes",
+            "modified",
+        ]
+        assert asdict(entry)["password"] == "secret"
+        assert repr(replace(entry, service="other.com")).startswith(
+            "KeyringEntry(service='other.com'"
+        )
+
 
+@pytest.mark.usefixtures("mock_get_keyring")
 class TestKeyringReader:
     """Tests for KeyringReader class."""
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_init_with_valid_backend(self, mock_get_keyring):
+    def test_init_with_valid_backend(self, mock_backend):
         """Test initialization with a valid keyring backend."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
-
         reader = KeyringReader()
         assert reader.backend == mock_backend
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
     def test_init_with_fail_backend_raises_error(self, mock_get_keyring):
         """Test initialization with FailKeyring raises RuntimeError."""
         mock_get_keyring.return_value = FailKeyring()
@@ -70,16 +171,10 @@ class TestKeyringReader:
         with pytest.raises(RuntimeError, match="No keyring backend available"):
             KeyringReader()
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_password")
-    def test_get_credential(self, mock_get_password, mock_get_keyring):
+    def test_get_credential(self, reader, mock_get_password):
         """Test getting a specific credential constructs proper KeyringEntry."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
         mock_get_password.return_value = "test_password"
 
-        reader = KeyringReader()
         entry = reader.get_credential("test_service", "test_user")
 
         # Verify it returns a proper KeyringEntry object
@@ -91,248 +186,413 @@ class TestKeyringReader:
         assert "test_password" not in repr(entry)
         mock_get_password.assert_called_once_with("test_service", "test_user")
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_password")
-    def test_get_credential_returns_none_not_exception(self, mock_get_password, mock_get_keyring):
+    def test_get_credential_remembers_lookups(self, reader, mock_get_password):
+        """Test that repeated lookups reuse the first result until the cache is cleared."""
+        mock_get_password.return_value = "test_password"
+
+        reader.get_credential("test_service", "test_user")
+        reader.get_credential("test_service", "test_user")
+        assert mock_get_password.call_count == 1
+
+        reader.clear_cache()
+        reader.get_credential("test_service", "test_user")
+        assert mock_get_password.call_count == 2
+
+    def test_get_credential_does_not_remember_missing_passwords(self, reader, mock_get_password):
+        """Test that a credential stored after a failed lookup is found on the next one."""
+        mock_get_password.side_effect = [None, "test_password"]
+
+        assert reader.get_credential("test_service", "test_user") is None
+        entry = reader.get_credential("test_service", "test_user")
+
+        assert entry.password == "test_password"
+        assert mock_get_password.call_count == 2
+
+    def test_get_credential_cache_is_per_reader(self, reader, mock_get_password):
+        """Test that passwords remembered by one reader aren't returned by another."""
+        mock_get_password.return_value = "test_password"
+        reader.get_credential("test_service", "test_user")
+
+        KeyringReader().get_credential("test_service", "test_user")
+
+        assert mock_get_password.call_count == 2
+
+    def test_get_credential_returns_none_not_exception(self, reader, mock_get_password):
         """Test that missing credentials return None, not raise exceptions."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
         mock_get_password.return_value = None
 
-        reader = KeyringReader()
         entry = reader.get_credential("missing_service", "missing_user")
         # Should return None for missing credentials, not raise exception
         assert entry is None
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_password")
-    def test_get_credential_handles_keyring_errors(self, mock_get_password, mock_get_keyring):
+    def test_get_credential_handles_keyring_errors(self, reader, mock_get_password):
         """Test that keyring errors are handled gracefully."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
         mock_get_password.side_effect = Exception("Keyring backend error")
 
-        reader = KeyringReader()
         entry = reader.get_credential("error_service", "error_user")
         # Should handle exceptions and return None
         assert entry is None
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_get_all_credentials_with_get_all_method(self, mock_get_keyring):
-        """Test that get_all_credentials correctly retrieves passwords for all creds."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
+    @pytest.mark.parametrize(
+        ("passwords", "expected"),
+        [
+            (
+                ["password1", "password2"],
+                [("service1", "user1", "password1"), ("service2", "user2", "password2")],
+            ),
+            # Credentials with None passwords are filtered out
+            (["password1", None], [("service1", "user1", "password1")]),
+        ],
+        ids=["all_passwords", "filter_empty"],
+    )
+    def test_get_all_credentials_with_get_all(
+        self, mock_get_keyring, mock_get_password, two_credentials, passwords, expected
+    ):
+        """Test that credentials listed by the backend are looked up through keyring."""
+        creds, _items = two_credentials
+        mock_backend = make_backend()
+        mock_backend.get_all_credentials.return_value = creds
+        mock_get_keyring.return_value = mock_backend
+        mock_get_password.side_effect = passwords
 
-        # Mock credentials returned by get_all_credentials
-        mock_cred1 = Mock()
-        mock_cred1.service = "service1"
-        mock_cred1.username = "user1"
-        mock_cred1.attributes = {"service": "service1", "username": "user1"}
+        entries = KeyringReader().get_all_credentials()
 
-        mock_cred2 = Mock()
-        mock_cred2.service = "service2"
-        mock_cred2.username = "user2"
-        mock_cred2.attributes = {"service": "service2", "username": "user2"}
+        assert all(isinstance(e, KeyringEntry) for e in entries)
+        assert [(e.service, e.username, e.password) for e in entries] == expected
+        # Passwords are looked up for each credential
+        assert mock_get_password.call_count == 2
+        mock_get_password.assert_any_call("service1", "user1")
+        mock_get_password.assert_any_call("service2", "user2")
 
-        mock_backend.get_all_credentials.return_value = [mock_cred1, mock_cred2]
+    def test_get_all_credentials_with_collection(
+        self, mock_get_keyring, mock_get_password, two_credentials
+    ):
+        """Test that items of the backend's collection are read after a single unlock."""
+        _creds, items = two_credentials
+        # No get_all_credentials(), so items are read from the backend's collection
+        mock_backend = make_backend(drop=["get_all_credentials", "get_preferred_collection"])
+        mock_backend.collection.is_locked.return_value = True
+        mock_backend.collection.get_all_items.return_value = items
         mock_get_keyring.return_value = mock_backend
 
-        with patch("keyring_to_kdbx.keyring_reader.keyring.get_password") as mock_get_password:
-            mock_get_password.side_effect = ["password1", "password2"]
+        entries = KeyringReader().get_all_credentials()
+
+        assert [(e.service, e.username, e.password) for e in entries] == [
+            ("service1", "user1", "password1"),
+            ("service2", "user2", "password2"),
+        ]
+        # Service/username come from the item attributes, secrets from the items
+        mock_get_password.assert_not_called()
+        assert all(item.get_secret.call_count == 1 for item in items)
+        mock_backend.collection.unlock.assert_called_once()
+        # Attributes are passed on read-only rather than copied
+        assert entries[0].attributes == {"service": "service1", "username": "user1"}
+        with pytest.raises(TypeError):
+            entries[0].attributes["service"] = "changed"
 
-            reader = KeyringReader()
-            entries = reader.get_all_credentials()
+    @pytest.mark.skipif(not HAS_SECRETSTORAGE, reason="secretstorage not available (Linux only)")
+    def test_get_all_credentials_with_secretstorage(
+        self, mock_get_keyring, mock_get_password, mock_secretstorage, two_credentials
+    ):
+        """Test that items of every secretstorage collection are read."""
+        _creds, items = two_credentials
+        # No get_all_credentials(), so items are read from every secretstorage collection
+        mock_get_keyring.return_value = make_backend(drop=["get_all_credentials"])
+        mock_collection = Mock()
+        mock_collection.is_locked.return_value = False
+        mock_collection.get_all_items.return_value = items
+        mock_secretstorage.get_all_collections.return_value = [mock_collection]
 
-            # Verify it calls get_password for each credential
-            assert mock_get_password.call_count == 2
-            mock_get_password.assert_any_call("service1", "user1")
-            mock_get_password.assert_any_call("service2", "user2")
-
-            # Verify all entries are KeyringEntry objects with correct data
-            assert len(entries) == 2
-            assert all(isinstance(e, KeyringEntry) for e in entries)
-            assert entries[0].service == "service1"
-            assert entries[0].username == "user1"
-            assert entries[0].password == "password1"
-            assert entries[1].service == "service2"
-            assert entries[1].username == "user2"
-            assert entries[1].password == "password2"
+        entries = KeyringReader().get_all_credentials()
 
-    @pytest.mark.skipif(not HAS_SECRETSTORAGE, reason="secretstorage not available (Linux only)")
-    @patch("keyring_to_kdbx.keyring_reader.secretstorage")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_get_all_credentials_with_get_preferred_collection(
-        self, mock_get_keyring, mock_secretstorage
+        assert [(e.service, e.username, e.password) for e in entries] == [
+            ("service1", "user1", "password1"),
+            ("service2", "user2", "password2"),
+        ]
+        # Service/username come from the item attributes, secrets from the items
+        mock_get_password.assert_not_called()
+        assert all(item.get_secret.call_count == 1 for item in items)
+        mock_secretstorage.dbus_init.assert_called_once()
+        mock_secretstorage.get_all_collections.assert_called_once()
+
+    def test_get_all_credentials_skips_duplicate_credentials(
+        self, reader, mock_get_password, mock_backend
+    ):
+        """Test that a credential listed twice is only looked up once."""
+        mock_backend.get_all_credentials.return_value = [
+            Mock(spec=[], service="service1", username="user1"),
+            Mock(spec=[], service="service1", username="user1"),
+            Mock(spec=[], service="service1", username="user2"),
+        ]
+        mock_get_password.side_effect = ["password1", "password2"]
+
+        entries = reader.get_all_credentials()
+
+        assert mock_get_password.call_count == 2
+        assert [(e.username, e.password) for e in entries] == [
+            ("user1", "password1"),
+            ("user2", "password2"),
+        ]
+
+    def test_get_all_credentials_remembers_missing_passwords(
+        self, reader, mock_get_password, mock_backend
+    ):
+        """Test that credentials without a password aren't looked up again."""
+        mock_backend.get_all_credentials.return_value = [
+            Mock(spec=[], service="service1", username="user1"),
+            Mock(spec=[], service="service2", username="user2"),
+        ]
+        mock_get_password.side_effect = lambda service, _username: (
+            None if service == "service1" else "password2"
+        )
+
+        reader.get_all_credentials()
+        entries = reader.get_all_credentials()
+
+        assert mock_get_password.call_count == 3
+        assert [e.service for e in entries] == ["service2"]
+
+    def test_iter_triples_yields_service_username_password(
+        self, reader, mock_get_password, mock_backend
     ):
-        """Test that secretstorage enumeration correctly retrieves credentials from all collections."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
+        """Test that iter_triples() yields plain tuples without attributes."""
+        mock_backend.get_all_credentials.return_value = [
+            Mock(spec=[], service="service1", username="user1", attributes={"a": "b"}),
+            Mock(spec=[], service="service2", username="user2"),
+        ]
+        mock_get_password.side_effect = ["password1", "password2"]
 
-        # Backend doesn't have get_all_credentials but has get_preferred_collection
-        del mock_backend.get_all_credentials
-        mock_backend.get_preferred_collection.return_value = Mock()
+        triples = list(reader.iter_triples())
 
+        assert triples == [("service1", "user1", "password1"), ("service2", "user2", "password2")]
+
+    def test_get_all_credentials_with_collection_reads_items_in_turn(self, mock_get_keyring):
+        """Test that collection items sharing a connection are read on one thread."""
+        mock_backend = make_backend(drop=["get_all_credentials", "get_preferred_collection"])
         mock_get_keyring.return_value = mock_backend
 
-        # Mock secretstorage to return collections
-        mock_connection = Mock()
-        mock_secretstorage.dbus_init.return_value = mock_connection
+        threads = set()
 
-        # Mock collection items
-        mock_item1 = Mock()
-        mock_item1.get_attributes.return_value = {
-            "service": "service1",
-            "username": "user1",
-        }
-        mock_item1.get_secret.return_value = b"password1"
-
-        mock_item2 = Mock()
-        mock_item2.get_attributes.return_value = {
-            "service": "service2",
-            "username": "user2",
-        }
-        mock_item2.get_secret.return_value = b"password2"
+        def get_secret(i):
+            threads.add(threading.current_thread())
+            if i == 3:
+                raise RuntimeError("item locked")
+            return f"service{i}:user{i}".encode()
 
+        items = []
+        for i in range(10):
+            item = Mock()
+            item.get_attributes.return_value = {"service": f"service{i}", "username": f"user{i}"}
+            item.get_secret.side_effect = lambda i=i: get_secret(i)
+            items.append(item)
+        mock_backend.collection.is_locked.return_value = False
+        mock_backend.collection.get_all_items.return_value = items
+
+        reader = KeyringReader(max_workers=4)
+        entries = reader.get_all_credentials()
+
+        assert threads == {threading.main_thread()}
+        # An item that can't be read is left out without losing the others
+        assert [e.service for e in entries] == [f"service{i}" for i in range(10) if i != 3]
+        assert all(e.password == f"{e.service}:{e.username}" for e in entries)
+
+    @pytest.mark.skipif(not HAS_SECRETSTORAGE, reason="secretstorage not available (Linux only)")
+    def test_get_all_credentials_with_secretstorage_reads_distinct_items(
+        self, mock_get_keyring, mock_secretstorage
+    ):
+        """Test that only items with identical attributes in a collection are read once."""
+        mock_get_keyring.return_value = make_backend(drop=["get_all_credentials"])
+
+        def make_item(protocol, secret):
+            item = Mock()
+            item.get_attributes.return_value = {
+                "server": "example.com",
+                "username": "user",
+                "protocol": protocol,
+            }
+            item.get_secret.return_value = secret.encode()
+            return item
+
+        collections = []
+        for items in (
+            [make_item("http", "first"), make_item("https", "second"), make_item("http", "copy")],
+            [make_item("http", "third")],
+        ):
+            collection = Mock()
+            collection.is_locked.return_value = False
+            collection.get_all_items.return_value = items
+            collections.append(collection)
+        mock_secretstorage.get_all_collections.return_value = collections
+
+        entries = KeyringReader().get_all_credentials()
+
+        # Same service and username, but a different protocol or collection
+        assert [e.password for e in entries] == ["first", "second", "third"]
+
+    @pytest.mark.skipif(not HAS_SECRETSTORAGE, reason="secretstorage not available (Linux only)")
+    def test_get_all_credentials_with_secretstorage_concurrent_reads(
+        self, mock_get_keyring, mock_secretstorage
+    ):
+        """Test that concurrent secretstorage reads use a D-Bus connection per thread."""
+        mock_get_keyring.return_value = make_backend(drop=["get_all_credentials"])
+
+        items = []
+        for i in range(10):
+            item = Mock(item_path=f"/item{i}")
+            item.get_attributes.return_value = {"service": f"service{i}", "username": f"user{i}"}
+            items.append(item)
         mock_collection = Mock()
         mock_collection.is_locked.return_value = False
-        mock_collection.get_label.return_value = "Test Collection"
-        mock_collection.get_all_items.return_value = [mock_item1, mock_item2]
+        mock_collection.get_all_items.return_value = items
+
+        connections = []
+        local = threading.local()
+
+        def dbus_init():
+            local.connection = Mock()
+            connections.append(local.connection)
+            return local.connection
+
+        def open_item(connection, item_path):
+            # Items are only read over the connection opened by the reading thread
+            assert connection is local.connection
+            item = Mock()
+            item.get_secret.return_value = f"secret{item_path}".encode()
+            return item
 
+        mock_secretstorage.dbus_init.side_effect = dbus_init
+        mock_secretstorage.Item.side_effect = open_item
         mock_secretstorage.get_all_collections.return_value = [mock_collection]
 
-        reader = KeyringReader()
+        entries = KeyringReader(max_workers=4).get_all_credentials()
+
+        assert [(e.service, e.password) for e in entries] == [
+            (f"service{i}", f"secret/item{i}") for i in range(10)
+        ]
+        assert not any(item.get_secret.called for item in items)
+        # One connection to enumerate the items, then one per worker
+        assert len(connections) == 5
+        assert all(connection.close.call_count == 1 for connection in connections[1:])
+
+    @pytest.mark.parametrize(
+        ("backend_base", "concurrent"),
+        [(object, True), (MacKeyring, False), (WinVaultKeyring, False)],
+    )
+    def test_get_all_credentials_concurrent_lookups_only_on_allowed_backends(
+        self, mock_get_keyring, mock_get_password, backend_base, concurrent
+    ):
+        """Test that password lookups don't use the thread pool on platform keyrings."""
+        backend_class = type("CustomKeyring", (backend_base,), {"get_all_credentials": Mock()})
+        mock_backend = backend_class()
+        # spec=[] so the credentials carry no password and every one is looked up
+        creds = [
+            Mock(spec=[], service=f"service{i}", username=f"user{i}", attributes={})
+            for i in range(8)
+        ]
+        mock_backend.get_all_credentials.return_value = creds
+        mock_get_keyring.return_value = mock_backend
+
+        threads = set()
+
+        def get_password(service, username):
+            threads.add(threading.current_thread())
+            return f"{service}:{username}"
+
+        mock_get_password.side_effect = get_password
+        reader = KeyringReader(max_workers=4)
         entries = reader.get_all_credentials()
 
-        # Verify it uses secretstorage
-        mock_secretstorage.dbus_init.assert_called_once()
-        mock_secretstorage.get_all_collections.assert_called_once()
+        assert [e.password for e in entries] == [f"service{i}:user{i}" for i in range(8)]
+        assert (threads != {threading.main_thread()}) is concurrent
 
-        # Verify it correctly extracts service/username from attributes
-        assert mock_item1.get_attributes.called
-        assert mock_item2.get_attributes.called
+    def test_get_all_credentials_uses_carried_password(
+        self, reader, mock_backend, mock_get_password
+    ):
+        """Test that a password carried by the credential isn't looked up again."""
+        mock_cred = Mock()
+        mock_cred.service = "service1"
+        mock_cred.username = "user1"
+        mock_cred.password = "password1"
+        mock_cred.attributes = {}
 
-        # Verify secrets retrieved directly from items
-        assert mock_item1.get_secret.called
-        assert mock_item2.get_secret.called
+        mock_backend.get_all_credentials.return_value = [mock_cred]
 
-        assert len(entries) == 2
-        assert entries[0].service == "service1"
-        assert entries[0].password == "password1"
-        assert entries[1].service == "service2"
-        assert entries[1].password == "password2"
-
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_get_all_credentials_with_collection(self, mock_get_keyring):
-        """Test that collection property fallback correctly extracts attributes."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-
-        # Backend doesn't have get_all_credentials or get_preferred_collection but has collection
-        del mock_backend.get_all_credentials
-        if hasattr(mock_backend, "get_preferred_collection"):
-            del mock_backend.get_preferred_collection
-
-        # Mock collection items
-        mock_item1 = Mock()
-        mock_item1.get_attributes.return_value = {
-            "service": "service1",
-            "username": "user1",
-        }
-
-        mock_item2 = Mock()
-        mock_item2.get_attributes.return_value = {
-            "service": "service2",
-            "username": "user2",
-        }
+        entries = reader.get_all_credentials()
 
-        mock_collection = Mock()
-        mock_collection.get_all_items.return_value = [mock_item1, mock_item2]
-        mock_backend.collection = mock_collection
+        mock_get_password.assert_not_called()
+        assert len(entries) == 1
+        assert entries[0].password == "password1"
 
-        mock_get_keyring.return_value = mock_backend
+    def test_iter_all_credentials_is_lazy(self, reader, mock_backend):
+        """Test that credentials are only read from the backend as they are consumed."""
+        mock_cred = Mock(spec=[], service="service1", username="user1", password="password1")
+        mock_backend.get_all_credentials.return_value = [mock_cred]
 
-        with patch("keyring_to_kdbx.keyring_reader.keyring.get_password") as mock_get_password:
-            mock_get_password.side_effect = ["password1", "password2"]
+        entries = reader.iter_all_credentials()
 
-            reader = KeyringReader()
-            entries = reader.get_all_credentials()
+        mock_backend.get_all_credentials.assert_not_called()
+        assert [e.password for e in entries] == ["password1"]
+        mock_backend.get_all_credentials.assert_called_once()
 
-            # Verify it correctly extracts service/username from attributes
-            assert mock_item1.get_attributes.called
-            assert mock_item2.get_attributes.called
+    def test_iter_all_credentials_yields_each_password_once_read(
+        self, reader, mock_backend, mock_get_password
+    ):
+        """Test that a credential is yielded before the next password is looked up."""
+        mock_backend.get_all_credentials.return_value = [
+            Mock(spec=[], service=f"service{i}", username=f"user{i}") for i in range(3)
+        ]
+        mock_get_password.side_effect = lambda service, _username: f"{service}:password"
 
-            # Verify it retrieves passwords for extracted credentials
-            assert mock_get_password.call_count == 2
-            mock_get_password.assert_any_call("service1", "user1")
-            mock_get_password.assert_any_call("service2", "user2")
+        entries = reader.iter_all_credentials()
 
-            assert len(entries) == 2
-            assert entries[0].service == "service1"
-            assert entries[0].password == "password1"
+        assert next(entries).service == "service0"
+        assert mock_get_password.call_count == 1
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_get_all_credentials_empty_keyring(self, mock_get_keyring):
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_get_all_credentials_skips_failed_lookups(
+        self, mock_backend, mock_get_password, max_workers
+    ):
+        """Test that a failing lookup only loses its own credential, and isn't a miss."""
+        mock_backend.get_all_credentials.return_value = [
+            Mock(spec=[], service=f"service{i}", username=f"user{i}") for i in range(3)
+        ]
+        failures = {"service1"}
+
+        def get_password(service, _username):
+            if service in failures:
+                failures.discard(service)
+                raise RuntimeError("backend error")
+            return f"{service}:password"
+
+        mock_get_password.side_effect = get_password
+        reader = KeyringReader(max_workers=max_workers)
+
+        assert [e.service for e in reader.get_all_credentials()] == ["service0", "service2"]
+        # The credential is looked up again on the next enumeration
+        assert [e.service for e in reader.get_all_credentials()] == [
+            "service0",
+            "service1",
+            "service2",
+        ]
+
+    def test_get_all_credentials_empty_keyring(self, reader, mock_backend):
         """Test that empty keyring returns empty list, not None or error."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
         mock_backend.get_all_credentials.return_value = []
-        mock_get_keyring.return_value = mock_backend
 
-        reader = KeyringReader()
         entries = reader.get_all_credentials()
 
         # Should return empty list (not None, not raise exception)
         assert entries == []
         assert isinstance(entries, list)
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_get_all_credentials_filters_empty_passwords(self, mock_get_keyring):
-        """Test that credentials with None passwords are filtered out."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-
-        mock_cred1 = Mock()
-        mock_cred1.service = "service1"
-        mock_cred1.username = "user1"
-        mock_cred1.attributes = {"service": "service1", "username": "user1"}
-
-        mock_cred2 = Mock()
-        mock_cred2.service = "service2"
-        mock_cred2.username = "user2"
-        mock_cred2.attributes = {"service": "service2", "username": "user2"}
-
-        mock_backend.get_all_credentials.return_value = [mock_cred1, mock_cred2]
-        mock_get_keyring.return_value = mock_backend
-
-        with patch("keyring_to_kdbx.keyring_reader.keyring.get_password") as mock_get_password:
-            # First has password, second doesn't
-            mock_get_password.side_effect = ["password1", None]
-
-            reader = KeyringReader()
-            entries = reader.get_all_credentials()
-
-            # Only credential with password should be included
-            assert len(entries) == 1
-            assert entries[0].service == "service1"
-            assert entries[0].password == "password1"
-
-    @patch("keyring_to_kdbx.keyring_reader.keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_test_backend_verifies_round_trip(self, mock_get_keyring, mock_keyring):
+    def test_test_backend_verifies_round_trip(self, reader, mock_keyring):
         """Test that backend test verifies full set/get/delete cycle."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
-
         # Mock successful set/get/delete cycle
         mock_keyring.get_password.return_value = "test_password_12345"
         mock_keyring.set_password.return_value = None
         mock_keyring.delete_password.return_value = None
 
-        reader = KeyringReader()
-        result = reader.test_backend()
+        result = reader.test_backend(deep=True)
 
         # Verify it performs all three operations
         mock_keyring.set_password.assert_called_once()
@@ -345,57 +605,47 @@ class TestKeyringReader:
 
         assert result is True
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_test_backend_detects_password_mismatch(self, mock_get_keyring, mock_keyring):
+    def test_test_backend_detects_password_mismatch(self, reader, mock_keyring):
         """Test that backend test fails if retrieved password doesn't match."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
-
         # Set succeeds but get returns wrong password
         mock_keyring.set_password.return_value = None
         mock_keyring.get_password.return_value = "wrong_password"
         mock_keyring.delete_password.return_value = None
 
-        reader = KeyringReader()
-        result = reader.test_backend()
+        result = reader.test_backend(deep=True)
 
         # Should fail because passwords don't match
         assert result is False
 
-    @patch("keyring_to_kdbx.keyring_reader.keyring")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
-    def test_test_backend_handles_exceptions(self, mock_get_keyring, mock_keyring):
+    def test_test_backend_handles_exceptions(self, reader, mock_keyring):
         """Test that backend test returns False on exceptions, not crash."""
-        mock_backend = Mock()
-        mock_backend.__class__.__name__ = "SecretServiceKeyring"
-        mock_get_keyring.return_value = mock_backend
-
         # Mock failed set operation
         mock_keyring.set_password.side_effect = Exception("Backend error")
 
-        reader = KeyringReader()
-        result = reader.test_backend()
+        result = reader.test_backend(deep=True)
 
         # Should return False, not raise exception
         assert result is False
 
+    @pytest.mark.parametrize(("priority", "expected"), [(5, True), (0, False)])
+    def test_test_backend_checks_priority_without_round_trip(
+        self, reader, mock_backend, mock_keyring, priority, expected
+    ):
+        """Test that the default backend test only checks the backend priority."""
+        mock_backend.priority = priority
+
+        assert reader.test_backend() is expected
+
+        mock_keyring.set_password.assert_not_called()
+        mock_keyring.get_password.assert_not_called()
+        mock_keyring.delete_password.assert_not_called()
+
     @pytest.mark.skipif(not HAS_SECRETSTORAGE, reason="secretstorage not available (Linux only)")
-    @patch("keyring_to_kdbx.keyring_reader.secretstorage")
-    @patch("keyring_to_kdbx.keyring_reader.keyring.get_keyring")
     def test_unsupported_backend_warning(self, mock_get_keyring, mock_secretstorage):
         """Test warning is logged for unsupported backends."""
-        mock_backend = Mock()
+        # Leave out everything that indicates enumeration support
+        mock_backend = make_backend(drop=_SECRET_SERVICE_SPEC)
         mock_backend.__class__.__name__ = "UnsupportedKeyring"
-
-        # Remove methods that indicate enumeration support
-        if hasattr(mock_backend, "get_all_credentials"):
-            del mock_backend.get_all_credentials
-        if hasattr(mock_backend, "get_preferred_collection"):
-            del mock_backend.get_preferred_collection
-        mock_backend.collection = None
-
         mock_get_keyring.return_value = mock_backend
 
         # Mock secretstorage to return empty collections
@@ -408,3 +658,22 @@ class TestKeyringReader:
 
         # Should return empty list for unsupported backend
         assert entries == []
+
+    @pytest.mark.parametrize(
+        ("backend_base", "message"),
+        [
+            (MacKeyring, "macOS Keychain backend detected"),
+            (WinVaultKeyring, "Windows Credential Manager backend detected"),
+            (object, "'CustomKeyring' does not support credential enumeration"),
+        ],
+    )
+    def test_non_enumerable_backend_warnings(self, mock_get_keyring, backend_base, message, caplog):
+        """Test that backends without enumeration support get a backend-specific warning."""
+        mock_get_keyring.return_value = type("CustomKeyring", (backend_base,), {})()
+
+        reader = KeyringReader()
+        with caplog.at_level("WARNING"):
+            entries = reader.get_all_credentials()
+
+        assert entries == []
+        assert message in caplog.text
@@ -0,0 +1,110 @@
+"""Tests for secret_cache module."""
+
+import json
+
+import pytest
+
+from keyring_to_kdbx.secret_cache import SecretCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Provide a temporary cache file path."""
+    return tmp_path / "cache" / "secrets.json"
+
+
+class TestSecretCache:
+    """Tests for SecretCache class."""
+
+    def test_recorded_secret_is_current_after_reload(self, cache_path):
+        """Test that a saved record matches the same item on the next run."""
+        cache = SecretCache(cache_path, "master")
+        cache.record("service", "user", 1.0, "password")
+        cache.save()
+
+        cache = SecretCache(cache_path, "master")
+        assert cache.is_current("service", "user", 1.0, "password")
+
+    def test_changed_item_is_not_current(self, cache_path):
+        """Test that a new modification time or stored password invalidates the record."""
+        cache = SecretCache(cache_path, "master")
+        cache.record("service", "user", 1.0, "password")
+
+        assert not cache.is_current("service", "user", 2.0, "password")
+        assert not cache.is_current("service", "user", 1.0, "other_password")
+        assert not cache.is_current("service", "user", 1.0, None)
+        assert not cache.is_current("service", "other_user", 1.0, "password")
+
+    def test_digests_depend_on_master_password(self, cache_path):
+        """Test that a cache written for one database doesn't match with another password."""
+        cache = SecretCache(cache_path, "master")
+        cache.record("service", "user", 1.0, "password")
+        cache.save()
+
+        cache = SecretCache(cache_path, "other_master")
+        assert not cache.is_current("service", "user", 1.0, "password")
+
+    def test_cache_file_does_not_contain_secrets(self, cache_path):
+        """Test that no secret, master password or credential name is written to disk."""
+        cache = SecretCache(cache_path, "master_password_123")
+        cache.record("service_name_789", "user_name_012", 1.0, "secret_password_456")
+        cache.save()
+
+        content = cache_path.read_text()
+        assert "secret_password_456" not in content
+        assert "master_password_123" not in content
+        assert "service_name_789" not in content
+        assert "user_name_012" not in content
+
+    def test_digests_are_salted_per_cache_file(self, tmp_path):
+        """Test that caches written with the same master password use different keys."""
+        first = SecretCache(tmp_path / "first.json", "master")
+        second = SecretCache(tmp_path / "second.json", "master")
+        first.record("service", "user", 1.0, "password")
+        second.record("service", "user", 1.0, "password")
+        first.save()
+        second.save()
+
+        assert (tmp_path / "first.json").read_text() != (tmp_path / "second.json").read_text()
+
+    @pytest.mark.parametrize("record", [None, 1.0, [], [1.0], [1.0, "a", "b"], {"a": 1}])
+    def test_malformed_record_is_not_current(self, cache_path, record):
+        """Test that a record of the wrong shape is treated as missing rather than failing."""
+        cache = SecretCache(cache_path, "master")
+        cache.record("service", "user", 1.0, "password")
+        cache.save()
+        state = json.loads(cache_path.read_text())
+        state["records"] = dict.fromkeys(state["records"], record)
+        cache_path.write_text(json.dumps(state))
+
+        cache = SecretCache(cache_path, "master")
+        assert not cache.is_current("service", "user", 1.0, "password")
+
+    def test_unreadable_cache_is_ignored(self, cache_path):
+        """Test that a corrupt cache file is treated as empty rather than failing."""
+        cache_path.parent.mkdir()
+        cache_path.write_text("not json")
+
+        cache = SecretCache(cache_path, "master")
+        assert not cache.is_current("service", "user", 1.0, "password")
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            {"service\u0000user": [1.0, "digest"]},
+            {"salt": "not hex", "records": {}},
+            {"salt": "00", "records": {}},
+            {"salt": "00" * 16, "records": []},
+        ],
+    )
+    def test_cache_in_unexpected_format_is_ignored(self, cache_path, content):
+        """Test that a cache file without a valid salt and records starts afresh."""
+        cache_path.parent.mkdir()
+        cache_path.write_text(json.dumps(content))
+
+        cache = SecretCache(cache_path, "master")
+        cache.record("service", "user", 1.0, "password")
+        cache.save()
+
+        cache = SecretCache(cache_path, "master")
+        assert cache.is_current("service", "user", 1.0, "password")